@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
 
     'users',
     'habits',
@@ -100,6 +102,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# При запуске тестов используется кэш в локальной памяти
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Время хранения страниц списка привычек пользователя в кэше, секунд
+HABIT_LIST_CACHE_TIMEOUT = 5 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -118,6 +143,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'users.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Быстрый (нестойкий) хешер для пользователей нагрузочных стендов (provision_users --fast-hash).
+# Включается только явно; при входе такие пароли перехешируются основным хешером.
+# В тестах используется по умолчанию, чтобы создание пользователей не замедляло тесты.
+FAST_PASSWORD_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+if 'test' in sys.argv:
+    PASSWORD_HASHERS.insert(0, FAST_PASSWORD_HASHER)
+elif os.getenv('FAST_PASSWORD_HASHER') == 'True':
+    PASSWORD_HASHERS.append(FAST_PASSWORD_HASHER)
+
+# Количество итераций PBKDF2 (подбирается командой calibrate_hasher под допустимую задержку входа)
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 600000))
+# Сколько паролей хешируется одновременно
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Кэш успешных проверок паролей в памяти процесса: количество записей (0 - отключён) и время жизни в секундах
+PASSWORD_VERIFY_CACHE_SIZE = int(os.getenv('PASSWORD_VERIFY_CACHE_SIZE', 0))
+PASSWORD_VERIFY_CACHE_TIMEOUT = 5 * 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -153,6 +203,10 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379'
 # Часовой пояс для работы Celery
 CELERY_TIMEZONE = 'Europe/Moscow'
 
+# Формат сериализации задач: в задачи передаются только идентификаторы и простые значения
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+
 # Флаг отслеживания выполнения задач
 CELERY_TASK_TRACK_STARTED = True
 
@@ -168,12 +222,49 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'users.tasks.disable_inactive_users',
         'schedule': timedelta(days=1),
     },
+    'delete_expired_verifications': {
+        'task': 'users.tasks.delete_expired_verifications',
+        'schedule': timedelta(hours=1),
+    },
     'test_print': {
         'task': 'habits.tasks.send_habit_reminder',
         'schedule': timedelta(seconds=10),
     }
 }
 
+# Настройки отправки оповещений в Telegram
+
+# Токен телеграм-бота
+TLG_BOT_TOKEN = os.getenv('TLG_BOT_TOKEN')
+
+# Количество привычек в одной задаче рассылки
+TELEGRAM_BATCH_SIZE = 100
+
+# Количество одновременно отправляемых сообщений (и размер пула соединений)
+TELEGRAM_MAX_WORKERS = 8
+
+# Таймаут запроса к Telegram API, секунд
+TELEGRAM_TIMEOUT = 10
+
+# Лимиты Telegram: сообщений в секунду всего и в один чат
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+
+# Количество шардов, на которые делится обработка одного тика оповещений
+REMINDER_SHARD_COUNT = int(os.getenv('REMINDER_SHARD_COUNT', 4))
+
+# Время жизни блокировки тика и шарда оповещений, секунд (на случай падения воркера)
+REMINDER_LOCK_TIMEOUT = 5 * 60
+
+# Индекс оповещений в Redis по минутам суток (UTC); при запуске тестов отключён
+REMINDER_INDEX_ENABLED = 'test' not in sys.argv
+REMINDER_INDEX_URL = os.getenv('REMINDER_INDEX_URL', 'redis://localhost:6379/2')
+
+# Максимальный разрыв (в минутах), который тик догоняет по индексу, и период поиска пропущенных
+# оповещений по БД
+REMINDER_INDEX_MAX_GAP = 60
+REMINDER_INDEX_SWEEP_MINUTES = 10
+
 # Определение модели пользователей
 AUTH_USER_MODEL = 'users.User'
 
@@ -183,21 +274,58 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
       'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'src.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'src.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5
 }
 
+# Максимальное количество привычек в одном запросе массовых операций
+HABIT_BULK_MAX_ITEMS = 100
+
+# Количество строк, читаемых из БД за один раз при выгрузке привычек
+HABIT_EXPORT_CHUNK_SIZE = 2000
+
+# Количество строк, проверяемых и записываемых за один раз при загрузке привычек
+HABIT_IMPORT_CHUNK_SIZE = 1000
+
 # Подключение JWT
 SIMPLE_JWT = {
    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
-   'REFRESH_TOKEN_LIFETIME': timedelta(seconds=10),
+   'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+   # Токен обновления одноразовый: при обновлении выдаётся новый, а использованный попадает в чёрный список
+   'ROTATE_REFRESH_TOKENS': True,
+   'BLACKLIST_AFTER_ROTATION': True,
+   # Время последнего входа (и обновления токена) нужно задаче disable_inactive_users
+   'UPDATE_LAST_LOGIN': True,
+   'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.UserTokenObtainPairSerializer',
+   'TOKEN_REFRESH_SERIALIZER': 'users.serializers.UserTokenRefreshSerializer',
+   'TOKEN_USER_CLASS': 'users.authentication.ClaimsUser',
 }
 
+# Срок действия кода подтверждения почты и размер пачки удаления просроченных кодов
+VERIFICATION_CODE_LIFETIME = timedelta(days=3)
+VERIFICATION_CLEANUP_BATCH_SIZE = 1000
+
+# Через сколько времени без входа пользователь деактивируется и размер пачки деактивации
+USER_INACTIVE_PERIOD = timedelta(days=180)
+USER_DEACTIVATION_BATCH_SIZE = 1000
+
+# Сколько секунд кэшируется проверка активности пользователя при аутентификации по JWT
+USER_ACTIVE_CACHE_TIMEOUT = 60
+
 # Подключение Swagger
 SWAGGER_SETTINGS = {
    'SECURITY_DEFINITIONS': {
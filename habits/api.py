@@ -1,16 +1,46 @@
+import codecs
+import hashlib
+import json
+from contextlib import nullcontext
+
 from rest_framework import generics
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
+from habits.importing import IMPORT_FORMATS, HabitImporter, get_import_format, read_rows
+from habits.export import EXPORT_FORMATS, export_habits, get_export_queryset
+from habits.cache import get_cache_stats, get_cached_page, get_public_feed_page, get_user_habits_key, set_cached_page
+from habits.mixins import ExpandMixin, OwnerQuerysetMixin, ValuesListMixin
 from habits.models import Habit
-from habits.serializers import HabitSerializer
+from habits.paginators import HabitCursorPagination
+from habits.serializers import HabitListSerializer, HabitSerializer, HabitValuesSerializer
 from users.permissions import IsOwnerPermission
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_412_PRECONDITION_FAILED
 
 from users.serializers import UserSerializer
 
 
+class PreconditionFailed(APIException):
+    status_code = HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Привычка была изменена другим запросом.'
+    default_code = 'precondition_failed'
+
+
+def get_habit_etag(data):
+    """ETag сериализованной привычки: меняется при изменении любого её поля."""
+    return '"{}"'.format(hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest())
+
+
 # API для списка и создания привычек пользователя
-class HabitList(generics.ListAPIView):
+class HabitList(ExpandMixin, OwnerQuerysetMixin, ValuesListMixin, generics.ListAPIView):
     """
     API для получения списка привычек пользователя.
 
@@ -31,17 +61,28 @@ class HabitList(generics.ListAPIView):
 
     Запросы:
     - GET: Получение списка привычек пользователя.
+
+    Параметр expand=linked_habit,user выводит связанную привычку и пользователя объектами вместо идентификаторов.
     """
 
+    queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    values_serializer_class = HabitValuesSerializer
     permission_classes = [IsAuthenticated, IsOwnerPermission]
+    pagination_class = HabitCursorPagination
 
-    def get_queryset(self):
-        return Habit.objects.filter(user=self.request.user)
+    def list(self, request, *args, **kwargs):
+        # Страницы списка кэшируются для каждого пользователя и сбрасываются при изменении его привычек
+        key = get_user_habits_key(request.user.id, request.build_absolute_uri())
+        data = get_cached_page(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            set_cached_page(key, data)
+        return Response(data)
 
 
 # API для списка публичных привычек
-class PublicHabitList(generics.ListAPIView):
+class PublicHabitList(ExpandMixin, ValuesListMixin, generics.ListAPIView):
     """
     API для получения списка публичных привычек.
 
@@ -62,9 +103,35 @@ class PublicHabitList(generics.ListAPIView):
 
     Запросы:
     - GET: Получение списка публичных привычек.
+
+    Параметр expand=linked_habit выводит публичную связанную привычку объектом вместо идентификатора.
+
+    Страницы ленты кэшируются и отдаются с заголовками ETag и Last-Modified: на условные запросы
+    (If-None-Match, If-Modified-Since) без изменений в ленте возвращается 304.
     """
     queryset = Habit.objects.filter(is_public=True)
     serializer_class = HabitSerializer
+    values_serializer_class = HabitValuesSerializer
+    permission_classes = [AllowAny]
+    pagination_class = HabitCursorPagination
+    # Данные владельцев в публичной ленте не раскрываются
+    expandable_fields = ('linked_habit',)
+    # Страницы ленты кэшируются общими для всех, поэтому разворачиваются только публичные связанные привычки
+    expand_own_private = False
+
+    def list(self, request, *args, **kwargs):
+        key, etag, last_modified = get_public_feed_page(request.build_absolute_uri())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            data = get_cached_page(key)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                set_cached_page(key, data)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
 
 
 # API для создания привычки
@@ -94,10 +161,10 @@ class HabitCreate(generics.CreateAPIView):
     serializer_class = HabitSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
 
 
-class HabitRetrieveAPIView(generics.RetrieveAPIView):
+class HabitRetrieveAPIView(ExpandMixin, OwnerQuerysetMixin, generics.RetrieveAPIView):
     """
     API для получения информации о конкретной привычке.
 
@@ -118,13 +185,23 @@ class HabitRetrieveAPIView(generics.RetrieveAPIView):
 
     Запросы:
     - GET: Получение информации о конкретной привычке.
+
+    Параметр expand=linked_habit,user выводит связанную привычку и пользователя объектами вместо идентификаторов.
+    Ответ содержит заголовок ETag, который можно передать в If-Match при обновлении привычки.
     """
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
     permission_classes = [IsAuthenticated, IsOwnerPermission]
 
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_serializer(self.get_object()).data
+        etag = get_habit_etag(data)
+        response = get_conditional_response(request, etag=etag) or Response(data)
+        response['ETag'] = etag
+        return response
+
 
-class HabitUpdateAPIView(generics.UpdateAPIView):
+class HabitUpdateAPIView(OwnerQuerysetMixin, generics.UpdateAPIView):
     """
     API для обновления информации о конкретной привычке.
 
@@ -146,6 +223,10 @@ class HabitUpdateAPIView(generics.UpdateAPIView):
     Запросы:
     - PUT: Обновление информации о привычке.
     - PATCH: Частичное обновление информации о конкретной привычке
+
+    Привычка читается одним запросом с условием на владельца, а записываются только изменённые поля.
+    С заголовком If-Match (ETag из ответа на получение или обновление привычки) привычка обновляется,
+    только если не была изменена с тех пор, иначе возвращается 412.
     """
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
@@ -153,27 +234,28 @@ class HabitUpdateAPIView(generics.UpdateAPIView):
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
-        serializer.is_valid(raise_exception=True)
-        if 'time' in request.data:
-            instance.time = request.data['time']
-        self.perform_update(serializer)
-        return Response(serializer.data)
-
-    def partial_update(self, request, *args, **kwargs):
-        kwargs['partial'] = True
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        if 'time' in request.data:
-            instance.time = request.data['time']
-            instance.save()  # Сохраняем изменения времени выполнения в базе данных
-        self.perform_update(serializer)
-        return Response(serializer.data)
-
-
-class HabitDestroyAPIView(generics.DestroyAPIView):
+        if_match = request.headers.get('If-Match')
+        # Для условного обновления строка блокируется до записи, чтобы проверка и запись были атомарны
+        with transaction.atomic() if if_match else nullcontext():
+            queryset = self.get_queryset()
+            if if_match:
+                queryset = queryset.select_for_update()
+            instance = get_object_or_404(queryset, pk=kwargs['pk'])
+            self.check_object_permissions(request, instance)
+            if if_match:
+                etags = parse_etags(if_match)
+                if '*' not in etags and get_habit_etag(self.get_serializer(instance).data) not in etags:
+                    raise PreconditionFailed()
+
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        response = Response(serializer.data)
+        response['ETag'] = get_habit_etag(serializer.data)
+        return response
+
+
+class HabitDestroyAPIView(OwnerQuerysetMixin, generics.DestroyAPIView):
     """
     API для удаления конкретной привычки.
 
@@ -200,6 +282,162 @@ class HabitDestroyAPIView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsOwnerPermission]
 
 
+class HabitBulkAPIView(OwnerQuerysetMixin, generics.GenericAPIView):
+    """
+    API для массовых операций с привычками пользователя.
+
+    Разрешения:
+    - Аутентифицированные пользователи могут изменять и удалять только свои привычки.
+
+    Запросы:
+    - POST: Создание списка привычек (поля - как у создания привычки).
+    - PATCH: Частичное обновление списка привычек, у каждого элемента обязательно поле id.
+    - DELETE: Удаление привычек по списку идентификаторов.
+
+    Все привычки проверяются по тем же правилам, что и при одиночных операциях, и записываются
+    одной транзакцией. Если хотя бы один элемент не прошёл проверку, ничего не записывается, а в ответе
+    возвращается список ошибок по каждому элементу.
+    """
+    queryset = Habit.objects.all()
+    serializer_class = HabitSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Ожидается непустой список.')
+        if len(items) > settings.HABIT_BULK_MAX_ITEMS:
+            raise ValidationError(f'Не больше {settings.HABIT_BULK_MAX_ITEMS} элементов за запрос.')
+        return items
+
+    def post(self, request):
+        serializer = HabitSerializer(data=self.get_items(request), many=True, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user_id=request.user.id)
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+    def patch(self, request):
+        items = self.get_items(request)
+        ids = [item.get('id') if isinstance(item, dict) and isinstance(item.get('id'), int) else None
+               for item in items]
+        habits = self.get_queryset().in_bulk([pk for pk in ids if pk is not None])
+
+        serializers, errors = [], []
+        for pk, item in zip(ids, items):
+            habit = habits.get(pk)
+            if habit is None:
+                errors.append({'id': ['Привычка не найдена.']})
+                continue
+            serializer = HabitSerializer(habit, data=item, partial=True, context={'request': request})
+            errors.append({} if serializer.is_valid() else serializer.errors)
+            serializers.append(serializer)
+        if any(errors):
+            return Response(errors, status=HTTP_400_BAD_REQUEST)
+
+        instances = HabitListSerializer(child=HabitSerializer()).update(
+            [serializer.instance for serializer in serializers],
+            [serializer.validated_data for serializer in serializers])
+        return Response(HabitSerializer(instances, many=True).data)
+
+    def delete(self, request):
+        ids = self.get_items(request)
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError('Ожидается список идентификаторов привычек.')
+        with transaction.atomic():
+            deleted, _ = self.get_queryset().filter(pk__in=ids).delete()
+        return Response({'deleted': deleted})
+
+
+class HabitExportAPIView(APIView):
+    """
+    API для выгрузки привычек.
+
+    Разрешения:
+    - Аутентифицированные пользователи выгружают свои привычки или все публичные привычки.
+
+    Параметры:
+    - export_format: ndjson (по умолчанию) или csv;
+    - scope: own (по умолчанию) - свои привычки, public - публичные привычки.
+
+    Запросы:
+    - GET: Выгрузка привычек (поля - как в списке привычек, включая время последнего оповещения).
+
+    Выгрузка передаётся потоком по мере чтения из БД, поэтому не ограничена по размеру.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': f'Допустимые значения: {", ".join(EXPORT_FORMATS)}.'})
+        scope = request.query_params.get('scope', 'own')
+        if scope not in ('own', 'public'):
+            raise ValidationError({'scope': 'Допустимые значения: own, public.'})
+
+        queryset = get_export_queryset(request.user.id if scope == 'own' else None)
+        response = StreamingHttpResponse(export_habits(queryset, export_format),
+                                         content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="habits_{scope}.{export_format}"'
+        return response
+
+
+class HabitImportAPIView(APIView):
+    """
+    API для загрузки привычек из файла.
+
+    Разрешения:
+    - Аутентифицированные пользователи загружают привычки себе.
+
+    Поля (multipart/form-data):
+    - file: файл NDJSON или CSV с полями, как в выгрузке привычек;
+    - import_format: ndjson или csv (по умолчанию определяется по расширению файла).
+
+    Запросы:
+    - POST: Загрузка привычек.
+
+    Строки проверяются по тем же правилам, что и при создании привычки; linked_habit ссылается на id
+    привычки в том же файле. Строки с ошибками пропускаются, в ответе - количество загруженных
+    и отклонённых строк, ошибки по номерам строк и скорость загрузки.
+    Файл не в кодировке UTF-8 отклоняется с ошибкой 400.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Файл не передан.'})
+        import_format = request.data.get('import_format') or get_import_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationError({'import_format': f'Допустимые значения: {", ".join(IMPORT_FORMATS)}.'})
+
+        rows = read_rows(codecs.iterdecode(upload, 'utf-8-sig'), import_format)
+        importer = HabitImporter(request.user.id)
+        try:
+            report = importer.run(rows)
+        except UnicodeDecodeError:
+            # Пачки до места ошибки уже записаны, сообщаем, сколько привычек загружено
+            raise ValidationError({'file': f'Файл должен быть в кодировке UTF-8. '
+                                           f'Загружено привычек до ошибки: {importer.created}.'})
+        return Response(report, status=HTTP_201_CREATED if report['created'] else HTTP_400_BAD_REQUEST)
+
+
+class HabitCacheStatsAPIView(APIView):
+    """
+    API для получения счётчиков кэша списков привычек.
+
+    Разрешения:
+    - Только администраторы.
+
+    Запросы:
+    - GET: Количество попаданий и промахов кэша.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """
     API для регистрации нового пользователя.
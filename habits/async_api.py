@@ -0,0 +1,100 @@
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.status import HTTP_201_CREATED
+
+from habits.api import get_habit_etag
+from habits.cache import get_user_habits_page, set_cached_page
+from habits.mixins import ExpandMixin, OwnerQuerysetMixin
+from habits.models import Habit
+from habits.paginators import HabitCursorPagination
+from habits.serializers import HabitSerializer, HabitValuesSerializer
+from src.views import AsyncGenericAPIView
+from users.permissions import IsOwnerPermission
+
+
+# Асинхронные варианты HabitList, HabitRetrieveAPIView и HabitCreate для развёртывания под ASGI (config/asgi.py).
+# Ответы совпадают с синхронными представлениями.
+
+class AsyncHabitList(ExpandMixin, OwnerQuerysetMixin, AsyncGenericAPIView):
+    """
+    Асинхронный API для получения списка привычек пользователя.
+
+    Разрешения:
+    - Аутентифицированные пользователи могут видеть только свои привычки.
+
+    Запросы:
+    - GET: Получение списка привычек пользователя (как habits:list, включая параметр expand и кэш страниц).
+    """
+    queryset = Habit.objects.all()
+    serializer_class = HabitSerializer
+    values_serializer_class = HabitValuesSerializer
+    permission_classes = [IsAuthenticated, IsOwnerPermission]
+    pagination_class = HabitCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        # Несколько обращений к кэшу выполняются одним переходом в поток
+        key, data = await sync_to_async(get_user_habits_page)(request.user.id, request.build_absolute_uri())
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if self.get_expand():
+                page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+                results = self.get_serializer(page, many=True).data
+            else:
+                values_serializer = self.values_serializer_class()
+                queryset = values_serializer.get_values(queryset)
+                page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+                results = values_serializer.to_representation(page)
+            data = self.get_paginated_response(results).data
+            await sync_to_async(set_cached_page)(key, data)
+        return Response(data)
+
+
+class AsyncHabitRetrieveAPIView(ExpandMixin, OwnerQuerysetMixin, AsyncGenericAPIView):
+    """
+    Асинхронный API для получения информации о конкретной привычке.
+
+    Разрешения:
+    - Аутентифицированные пользователи могут просматривать только свою привычку.
+
+    Запросы:
+    - GET: Получение информации о конкретной привычке (как habits:retrieve, с заголовком ETag).
+    """
+    queryset = Habit.objects.all()
+    serializer_class = HabitSerializer
+    permission_classes = [IsAuthenticated, IsOwnerPermission]
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            habit = await self.filter_queryset(self.get_queryset()).aget(pk=kwargs['pk'])
+        except Habit.DoesNotExist:
+            raise NotFound
+        self.check_object_permissions(request, habit)
+        data = self.get_serializer(habit).data
+        etag = get_habit_etag(data)
+        response = get_conditional_response(request, etag=etag) or Response(data)
+        response['ETag'] = etag
+        return response
+
+
+class AsyncHabitCreate(AsyncGenericAPIView):
+    """
+    Асинхронный API для создания привычки.
+
+    Разрешения:
+    - Аутентифицированные пользователи могут создавать привычки.
+
+    Запросы:
+    - POST: Создание новой привычки (как habits:create).
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = HabitSerializer
+
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        # Проверка связанной привычки загружает её синхронным ORM
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        serializer.instance = await Habit.objects.acreate(user_id=request.user.id, **serializer.validated_data)
+        return Response(serializer.data, status=HTTP_201_CREATED)
@@ -0,0 +1,97 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Счётчики обращений к кэшу списков привычек
+CACHE_STATS = ('hits', 'misses')
+
+
+def get_user_habits_version(user_id):
+    """Текущая версия кэша привычек пользователя. Смена версии делает все его страницы недействительными."""
+    key = f'habits:list:version:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_user_habits(*user_ids):
+    """Сбрасывает кэш списков привычек пользователей одной командой к кэшу."""
+    cache.set_many({f'habits:list:version:{user_id}': uuid.uuid4().hex for user_id in user_ids if user_id},
+                   timeout=None)
+
+
+def get_user_habits_key(user_id, url):
+    """
+    Ключ страницы списка привычек пользователя.
+
+    Ключ включает версию, поэтому страница, посчитанная до изменения привычек, сохраняется под старой
+    версией и не попадёт в выдачу после сброса.
+    """
+    url_hash = hashlib.md5(url.encode()).hexdigest()
+    return f'habits:list:{user_id}:{get_user_habits_version(user_id)}:{url_hash}'
+
+
+def get_cached_page(key):
+    """Сериализованная страница списка из кэша или None."""
+    data = cache.get(key)
+    incr_stat('hits' if data is not None else 'misses')
+    return data
+
+
+def get_user_habits_page(user_id, url):
+    """Ключ и закэшированная страница списка привычек пользователя (None, если её нет в кэше)."""
+    key = get_user_habits_key(user_id, url)
+    return key, get_cached_page(key)
+
+
+def set_cached_page(key, data):
+    cache.set(key, data, settings.HABIT_LIST_CACHE_TIMEOUT)
+
+
+def get_public_feed_state():
+    """
+    Версия и время последнего изменения ленты публичных привычек.
+
+    Версия меняется только при изменениях, затрагивающих ленту (публикация, снятие с публикации,
+    изменение или удаление публичной привычки или привычки, на которую ссылается публичная), поэтому
+    изменения остальных приватных привычек её не сбрасывают.
+    """
+    state = cache.get('habits:public:state')
+    if state is None:
+        state = {'version': uuid.uuid4().hex, 'modified': int(time.time())}
+        cache.add('habits:public:state', state, timeout=None)
+        state = cache.get('habits:public:state', state)
+    return state
+
+
+def invalidate_public_feed():
+    cache.set('habits:public:state', {'version': uuid.uuid4().hex, 'modified': int(time.time())}, timeout=None)
+
+
+def get_public_feed_page(url):
+    """
+    Ключ кэша, ETag и время изменения (Unix time) страницы ленты публичных привычек.
+
+    ETag зависит от версии ленты и адреса страницы, поэтому клиент может перепроверять страницу
+    условным запросом и получать 304, пока лента не изменилась.
+    """
+    state = get_public_feed_state()
+    page_hash = hashlib.md5(f'{state["version"]}:{url}'.encode()).hexdigest()
+    return f'habits:public:{page_hash}', f'"{page_hash}"', state['modified']
+
+
+def incr_stat(name):
+    key = f'habits:list:stats:{name}'
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def get_cache_stats():
+    values = cache.get_many([f'habits:list:stats:{name}' for name in CACHE_STATS])
+    return {name: values.get(f'habits:list:stats:{name}', 0) for name in CACHE_STATS}
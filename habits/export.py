@@ -0,0 +1,65 @@
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+
+from habits.models import Habit
+from habits.serializers import HabitValuesSerializer
+from src.renderers import FastJSONRenderer
+
+# Форматы выгрузки и их типы содержимого
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def get_export_queryset(user_id=None):
+    """Привычки пользователя или, если пользователь не указан, все публичные привычки."""
+    if user_id is None:
+        return Habit.objects.filter(is_public=True)
+    return Habit.objects.filter(user_id=user_id)
+
+
+def iter_habit_chunks(queryset, chunk_size=None):
+    """
+    Привычки в том же представлении, что и в API, пачками по chunk_size.
+
+    Строки читаются через iterator() (в PostgreSQL - серверным курсором) без объектов моделей,
+    поэтому память не зависит от общего количества привычек.
+    """
+    chunk_size = chunk_size or settings.HABIT_EXPORT_CHUNK_SIZE
+    values_serializer = HabitValuesSerializer()
+    rows = values_serializer.get_values(queryset.order_by('id')).iterator(chunk_size=chunk_size)
+    for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+        yield values_serializer.to_representation(chunk)
+
+
+def export_ndjson(chunks):
+    """Одна привычка - одна строка JSON."""
+    render = FastJSONRenderer().render
+    for chunk in chunks:
+        yield b''.join(render(habit) + b'\n' for habit in chunk)
+
+
+def export_csv(chunks):
+    """CSV с заголовком из названий полей; пустые значения выводятся пустыми ячейками."""
+    fieldnames = [name for name, _, _ in HabitValuesSerializer().fields]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Пустая выгрузка: только заголовок
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_habits(queryset, export_format, chunk_size=None):
+    """Генератор выгрузки привычек в формате export_format (ключ EXPORT_FORMATS) частями в байтах."""
+    exporter = export_csv if export_format == 'csv' else export_ndjson
+    return exporter(iter_habit_chunks(queryset, chunk_size))
@@ -0,0 +1,155 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from habits.models import Habit, compute_next_due_at
+from habits.serializers import HabitImportSerializer
+from habits.signals import habits_bulk_saved
+
+# Поддерживаемые форматы загрузки
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# Сколько отклонённых строк возвращается в отчёте с ошибками (счётчик учитывает все)
+MAX_REPORTED_ERRORS = 1000
+
+
+def get_import_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'ndjson'
+
+
+def read_rows(lines, import_format):
+    """
+    Строки файла в виде (номер строки, словарь полей или текст ошибки разбора).
+
+    lines - итерируемые текстовые строки файла. Пустые ячейки CSV считаются незаполненными полями.
+    """
+    if import_format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=2):
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f'Некорректный JSON: {exc}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Ожидается объект JSON.'
+
+
+def has_linked_habit(row):
+    return isinstance(row, dict) and row.get('linked_habit') not in (None, '')
+
+
+class HabitImporter:
+    """
+    Загрузка привычек пользователя пачками по chunk_size строк.
+
+    Каждая строка проверяется HabitImportSerializer, прошедшие проверку привычки пачки записываются
+    одним bulk_create в отдельной транзакции, отклонённые строки попадают в отчёт. Связанные привычки
+    (приятные, сами без связей) записываются раньше ссылающихся на них, поэтому строки со ссылкой вперёд
+    по файлу откладываются до конца загрузки.
+    """
+
+    def __init__(self, user_id, chunk_size=None):
+        self.user_id = user_id
+        self.chunk_size = chunk_size or settings.HABIT_IMPORT_CHUNK_SIZE
+        # id из файла -> (pk созданной привычки, is_pleasant)
+        self.habits = {}
+        self.serializer = HabitImportSerializer(context={'habits': self.habits})
+        self.created = 0
+        self.rejected = 0
+        self.errors = []
+
+    def run(self, rows):
+        """Загружает строки из read_rows и возвращает отчёт."""
+        started = time.perf_counter()
+        rows = iter(rows)
+        pending = []
+        for chunk in iter(lambda: list(islice(rows, self.chunk_size)), []):
+            self.save([row for row in chunk if not has_linked_habit(row[1])])
+            linked = [row for row in chunk if has_linked_habit(row[1])]
+            self.save([row for row in linked if str(row[1]['linked_habit']) in self.habits])
+            pending.extend(row for row in linked if str(row[1]['linked_habit']) not in self.habits)
+        # Оставшиеся ссылки на привычки, которых нет в файле, будут отклонены при проверке
+        for start in range(0, len(pending), self.chunk_size):
+            self.save(pending[start:start + self.chunk_size])
+
+        seconds = time.perf_counter() - started
+        return {
+            'created': self.created,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round((self.created + self.rejected) / seconds) if seconds else 0,
+        }
+
+    def reject(self, number, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': number, 'errors': errors})
+
+    def save(self, rows):
+        now = timezone.now()
+        due_at = {}
+
+        def get_next_due_at(habit):
+            # Время следующего оповещения одинаково у привычек с одинаковыми временем и периодичностью
+            key = (habit.get_reminder_time(), habit.periodicity, habit.last_notification)
+            if key not in due_at:
+                due_at[key] = compute_next_due_at(*key, after=now)
+            return due_at[key]
+
+        habits, sources, times = [], [], []
+        seen = set()
+        for number, data in rows:
+            if isinstance(data, str):
+                self.reject(number, {'non_field_errors': [data]})
+                continue
+            source = str(data['id']) if data.get('id') not in (None, '') else None
+            if source is not None and (source in self.habits or source in seen):
+                self.reject(number, {'id': ['Повторяющийся идентификатор привычки.']})
+                continue
+            try:
+                attrs = self.serializer.run_validation(data)
+            except serializers.ValidationError as exc:
+                self.reject(number, exc.detail)
+                continue
+            value = attrs.pop('time', None)
+            habit = Habit(user_id=self.user_id, **attrs)
+            if value is None:
+                # bulk_create не вызывает save(), поэтому время следующего оповещения считаем здесь
+                habit.next_due_at = get_next_due_at(habit)
+            habits.append(habit)
+            sources.append(source)
+            seen.add(source)
+            times.append(value)
+        if not habits:
+            return
+
+        with transaction.atomic():
+            Habit.objects.bulk_create(habits)
+            # Поле time заполняется текущим временем при создании (auto_now_add), поэтому время из файла
+            # записывается после вставки: одним UPDATE на каждую пару (время, следующее оповещение)
+            groups = defaultdict(list)
+            for habit, value in zip(habits, times):
+                if value is not None:
+                    habit.time = value
+                    habit.next_due_at = get_next_due_at(habit)
+                    groups[habit.time, habit.next_due_at].append(habit.pk)
+            for (value, next_due_at), pks in groups.items():
+                Habit.objects.filter(pk__in=pks).update(time=value, next_due_at=next_due_at)
+            habits_bulk_saved(habits)
+
+        for habit, source in zip(habits, sources):
+            if source is not None:
+                self.habits[source] = (habit.pk, habit.is_pleasant)
+        self.created += len(habits)
@@ -0,0 +1,258 @@
+import datetime
+import json
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import tasks
+from habits import urls as habits_urls
+from habits.models import Habit
+from src.benchmarks import rolled_back
+from users import urls as users_urls
+from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
+from users.verification import reissue_verification
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class NoopTelegramClient:
+    # Сеть Telegram не измеряется: все сообщения считаются отправленными
+    def send_messages(self, messages):
+        return dict.fromkeys(messages)
+
+
+class Command(BaseCommand):
+    help = ('Measure latency percentiles and query counts of every habits/users API route and of the reminder tick; '
+            'all writes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Measured runs of each case')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured runs before each case')
+        parser.add_argument('--batch', type=int, default=10, help='Items per bulk/import request')
+        parser.add_argument('--host', type=str, default='localhost', help='Host header of the requests')
+        parser.add_argument('--cases', type=str, nargs='+', help='Only run cases whose name contains one of these')
+        parser.add_argument('--output', type=str, help='Write JSON results to this file')
+        parser.add_argument('--compare', type=str, help='JSON results of a previous run to compare with')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('--repeat must be at least 2')
+        if not Habit.objects.filter(user__isnull=False).exists():
+            raise CommandError('No habits to measure, run seed_load first')
+
+        results = {}
+        with rolled_back():
+            for name, func in self.get_cases(options):
+                if options['cases'] and not any(part in name for part in options['cases']):
+                    continue
+                results[name] = self.measure(func, options['repeat'], options['warmup'])
+
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'users': User.objects.count(),
+                'habits': Habit.objects.count(),
+                'repeat': options['repeat'],
+                'batch': options['batch'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['results']
+        for name, result in results.items():
+            line = (f'{name:<32} p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+                    f'p99 {result["p99_ms"]:8.2f} ms  queries {result["queries"]:>3}  status {result["status"]}')
+            if name in baseline:
+                previous = baseline[name]
+                change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+                line += f'  (p50 {change:+.0f}%, queries {previous["queries"]} -> {result["queries"]})'
+            self.stdout.write(line)
+
+    def measure(self, func, repeat, warmup):
+        for i in range(warmup):
+            func(i)()
+        timings, queries, statuses = [], [], set()
+        for i in range(warmup, warmup + repeat):
+            # Подготовка запроса (данные, файлы, токены) не входит в измерение
+            call = func(i)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                statuses.add(call())
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context))
+
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'p50_ms': percentiles[49],
+            'p90_ms': percentiles[89],
+            'p95_ms': percentiles[94],
+            'p99_ms': percentiles[98],
+            'mean_ms': statistics.mean(timings),
+            'max_ms': max(timings),
+            'queries': round(statistics.median(queries)),
+            'max_queries': max(queries),
+            'status': sorted(statuses, key=str),
+        }
+
+    def get_cases(self, options):
+        """Пары (название, func): func(i) готовит i-й запуск и возвращает функцию, выполняющую его."""
+        batch = options['batch']
+        runs = options['repeat'] + options['warmup']
+        run_id = uuid.uuid4().hex[:8]
+
+        # Пользователь с привычками из середины таблицы; пароль и права меняются только внутри транзакции
+        middle = Habit.objects.filter(user__isnull=False).order_by('-id').values_list('id', flat=True)[:1][0] // 2
+        user = User.objects.get(pk=Habit.objects.filter(pk__gte=middle, user__isnull=False)
+                                .order_by('id').values_list('user_id', flat=True)[:1][0])
+        user.is_staff = True
+        user.set_password(BENCH_PASSWORD)
+        user.save()
+
+        fixtures = Habit.objects.bulk_create(
+            Habit(user=user, action=f'Bench {i}', place='Home', execution_time=60)
+            for i in range(1 + batch + runs + runs * batch))
+        habit, updated, deleted = fixtures[0], fixtures[1:1 + batch], fixtures[1 + batch:1 + batch + runs]
+        bulk_deleted = fixtures[1 + batch + runs:]
+
+        client = Client(HTTP_HOST=options['host'],
+                        HTTP_AUTHORIZATION=f'Bearer {UserTokenObtainPairSerializer.get_token(user).access_token}')
+        anonymous = Client(HTTP_HOST=options['host'])
+
+        def http(client, method, path, data=None, content_type='application/json'):
+            def call():
+                if method == 'get' or content_type is None:
+                    response = getattr(client, method)(path, data)
+                else:
+                    response = getattr(client, method)(path, json.dumps(data), content_type=content_type)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                return response.status_code
+            return call
+
+        def habit_data(i):
+            return {'action': f'Bench {run_id} {i}', 'place': 'Home', 'execution_time': 60}
+
+        def verify(i):
+            # Код выдаётся заново перед каждым запуском: подтверждение удаляет его
+            User.objects.filter(pk=user.pk).update(is_verified=False)
+            return http(anonymous, 'post', reverse('users:verify'), {'code': reissue_verification(user.pk).code})
+
+        def upload(i):
+            content = '\n'.join(json.dumps({'id': j, **habit_data(j)}) for j in range(batch))
+            return {'file': SimpleUploadedFile(f'bench_{i}.ndjson', content.encode())}
+
+        cases = [
+            # Списки: повторный запрос отдаётся из кэша, уникальный параметр обходит кэш
+            ('habits:list', lambda i: http(client, 'get', reverse('habits:list'))),
+            ('habits:list uncached', lambda i: http(client, 'get', reverse('habits:list'), {'bench': f'{run_id}{i}'})),
+            ('habits:list expand', lambda i: http(client, 'get', reverse('habits:list'),
+                                                  {'expand': 'linked_habit,user', 'bench': f'{run_id}{i}'})),
+            ('habits:public', lambda i: http(anonymous, 'get', reverse('habits:public'))),
+            ('habits:public uncached', lambda i: http(anonymous, 'get', reverse('habits:public'),
+                                                      {'bench': f'{run_id}{i}'})),
+            ('habits:create', lambda i: http(client, 'post', reverse('habits:create'), habit_data(i))),
+            ('habits:retrieve', lambda i: http(client, 'get', reverse('habits:retrieve', args=[habit.pk]))),
+            ('habits:update', lambda i: http(client, 'patch', reverse('habits:update', args=[habit.pk]),
+                                             {'execution_time': 10 + i % 100})),
+            ('habits:delete', lambda i: http(client, 'delete', reverse('habits:delete', args=[deleted[i].pk]))),
+            ('habits:bulk create', lambda i: http(client, 'post', reverse('habits:bulk'),
+                                                  [habit_data(j) for j in range(batch)])),
+            ('habits:bulk update', lambda i: http(client, 'patch', reverse('habits:bulk'),
+                                                  [{'id': h.pk, 'execution_time': 10 + i % 100} for h in updated])),
+            ('habits:bulk delete', lambda i: http(client, 'delete', reverse('habits:bulk'),
+                                                  [h.pk for h in bulk_deleted[i * batch:(i + 1) * batch]])),
+            ('habits:export', lambda i: http(client, 'get', reverse('habits:export'))),
+            ('habits:export public', lambda i: http(client, 'get', reverse('habits:export'),
+                                                    {'scope': 'public', 'export_format': 'csv'})),
+            ('habits:import', lambda i: http(client, 'post', reverse('habits:import'), upload(i), content_type=None)),
+            # Асинхронные варианты; тестовый клиент выполняет их через async_to_sync, как WSGI-развёртывание
+            ('habits:async-list', lambda i: http(client, 'get', reverse('habits:async-list'))),
+            ('habits:async-list uncached', lambda i: http(client, 'get', reverse('habits:async-list'),
+                                                          {'bench': f'{run_id}{i}'})),
+            ('habits:async-retrieve', lambda i: http(client, 'get', reverse('habits:async-retrieve', args=[habit.pk]))),
+            ('habits:async-create', lambda i: http(client, 'post', reverse('habits:async-create'), habit_data(i))),
+            ('habits:cache-stats', lambda i: http(client, 'get', reverse('habits:cache-stats'))),
+            ('users:token_obtain_pair', lambda i: http(anonymous, 'post', reverse('users:token_obtain_pair'),
+                                                       {'email': user.email, 'password': BENCH_PASSWORD})),
+            ('users:token_refresh', lambda i: http(anonymous, 'post', reverse('users:token_refresh'),
+                                                   {'refresh': str(UserTokenObtainPairSerializer.get_token(user))})),
+            ('users:user-registration', lambda i: http(anonymous, 'post', reverse('users:user-registration'),
+                                                       {'email': f'bench_{run_id}_{i}@example.com',
+                                                        'password': BENCH_PASSWORD})),
+            ('users:verify', verify),
+        ]
+
+        # Маршруты без сценария попадают в отчёт предупреждением, чтобы набор не отставал от urls.py
+        routes = {f'habits:{pattern.name}' for pattern in habits_urls.urlpatterns}
+        routes |= {f'users:{pattern.name}' for pattern in users_urls.urlpatterns}
+        for route in sorted(routes - {name.split()[0] for name, _ in cases}):
+            self.stderr.write(f'No benchmark case for route {route}')
+
+        # Тик оповещений: постановка задач в очередь и сеть Telegram заменены заглушками
+        now = timezone.now()
+        shard_count = settings.REMINDER_SHARD_COUNT
+        chat_habit_ids = list(Habit.objects.filter(user__tlg_chat_id__isnull=False)
+                              .order_by('id').values_list('id', flat=True)[:batch])
+        tick_cache = LocMemCache(f'bench-api-{run_id}', {})
+
+        @contextmanager
+        def isolated_tick():
+            # Блокировки, ключи идемпотентности, счётчики и отметки индекса оповещений хранятся в Redis и
+            # не откатываются вместе с транзакцией, поэтому тик работает с кэшем в памяти и без индекса
+            # (шарды ищут наступившие оповещения в БД)
+            with override_settings(REMINDER_INDEX_ENABLED=False), \
+                    mock.patch('habits.reminders.cache', tick_cache), \
+                    mock.patch('habits.reminders.get_cache_redis_client', return_value=None):
+                yield
+
+        def tick(i):
+            def call():
+                with isolated_tick(), mock.patch.object(tasks.send_habit_reminder_shard, 'delay'):
+                    tasks.send_habit_reminder()
+            return call
+
+        def tick_shard(i):
+            # Каждый запуск - следующая минута, чтобы находились новые наступившие оповещения
+            moment = (now + datetime.timedelta(minutes=i)).isoformat()
+
+            def call():
+                with isolated_tick(), mock.patch.object(tasks.send_notifications, 'delay'):
+                    tasks.send_habit_reminder_shard(i % shard_count, shard_count, moment)
+            return call
+
+        def notifications(i):
+            def call():
+                with isolated_tick(), mock.patch.object(tasks, 'get_telegram_client', NoopTelegramClient):
+                    tasks.send_notifications(chat_habit_ids, period=f'bench-{run_id}-{i}')
+            return call
+
+        cases += [
+            ('tick send_habit_reminder', tick),
+            ('tick send_habit_reminder_shard', tick_shard),
+            ('tick send_notifications', notifications),
+        ]
+        return cases
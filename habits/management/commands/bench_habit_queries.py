@@ -0,0 +1,81 @@
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.reminders import get_shard_queryset
+from habits.seeding import seed_habits, seed_users
+from src.benchmarks import rolled_back
+
+
+class Command(BaseCommand):
+    help = 'Show query plans and timings of the hot habit queries, optionally with and without Habit indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Create this many habits before measuring')
+        parser.add_argument('--users', type=int, default=10000, help='Users to spread seeded habits over')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs of each query')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also measure with Habit.Meta.indexes dropped (PostgreSQL, rolled back)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            user_ids = seed_users(options['users'])
+            seed_habits(user_ids, options['seed'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Habit._meta.db_table}' if connection.vendor == 'postgresql' else 'ANALYZE')
+
+        if not Habit.objects.exists():
+            raise CommandError('No habits to measure, use --seed')
+
+        results = {'with_indexes': self.measure(options['repeat'])}
+        if options['compare']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--compare needs transactional DDL (PostgreSQL)')
+            with rolled_back():
+                with connection.schema_editor() as editor:
+                    for index in Habit._meta.indexes:
+                        editor.remove_index(Habit, index)
+                results['without_indexes'] = self.measure(options['repeat'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for variant, queries in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(variant))
+            for name, result in queries.items():
+                self.stdout.write(f'{name}: median {result["median_ms"]:.3f} ms, p95 {result["p95_ms"]:.3f} ms')
+                self.stdout.write(result['plan'])
+
+    def get_queries(self):
+        """Запросы в том виде, в котором их выполняют API и планировщик оповещений."""
+        middle_id = Habit.objects.order_by('-id').values_list('id', flat=True).first() // 2
+        habit = Habit.objects.filter(id__gte=middle_id).order_by('id').only('user_id').first()
+        now = timezone.now()
+        return {
+            'user_list': Habit.objects.filter(user_id=habit.user_id).order_by('id')[:6],
+            'public_feed': Habit.objects.filter(is_public=True, id__gt=middle_id).order_by('id')[:6],
+            'due_reminders': get_shard_queryset(0, 1).filter(next_due_at__lte=now).order_by('pk').values_list('id'),
+        }
+
+    def measure(self, repeat):
+        explain_options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        results = {}
+        for name, queryset in self.get_queries().items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                'plan': queryset.explain(**explain_options),
+            }
+        return results
@@ -0,0 +1,63 @@
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from habits.models import Habit
+from habits.seeding import seed_habits, seed_users
+from habits.serializers import HabitSerializer, HabitValuesSerializer
+from src.benchmarks import rolled_back
+
+
+class Command(BaseCommand):
+    help = ('Compare HabitSerializer with the values-based list serialization (fetch + serialize + render); '
+            'habits seeded for the run are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000], help='List sizes to measure')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs of each measurement')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        # Недостающие привычки создаются только на время измерений
+        with rolled_back():
+            missing = max(options['rows']) - Habit.objects.count()
+            if missing > 0:
+                seed_habits(seed_users(100, prefix='bench_serializers'), missing)
+            results = self.measure(options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f'{result["rows"]:>6} rows: HabitSerializer {result["model_serializer_ms"]:.2f} ms, '
+                f'values {result["values_ms"]:.2f} ms, x{result["speedup"]:.1f}')
+
+    def measure(self, options):
+        renderer = JSONRenderer()
+        values_serializer = HabitValuesSerializer()
+
+        def model_serializer(queryset):
+            return renderer.render(HabitSerializer(queryset, many=True).data)
+
+        def values(queryset):
+            return renderer.render(values_serializer.to_representation(values_serializer.get_values(queryset)))
+
+        results = []
+        for rows in options['rows']:
+            queryset = Habit.objects.order_by('id')[:rows]
+            assert model_serializer(queryset) == values(queryset)
+            result = {'rows': rows}
+            for name, func in (('model_serializer', model_serializer), ('values', values)):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    func(queryset.all())
+                    timings.append((time.perf_counter() - started) * 1000)
+                result[f'{name}_ms'] = statistics.median(timings)
+            result['speedup'] = result['model_serializer_ms'] / result['values_ms']
+            results.append(result)
+        return results
@@ -0,0 +1,190 @@
+import asyncio
+import importlib.util
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand, CommandError
+from django.urls import reverse
+
+from habits.models import Habit
+from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
+
+# Сервер и маршруты каждого развёртывания: под ASGI - асинхронные представления, под WSGI - синхронные
+DEPLOYMENTS = {
+    'asgi': {'module': 'uvicorn', 'list': 'habits:async-list', 'retrieve': 'habits:async-retrieve'},
+    'wsgi': {'module': 'gunicorn', 'list': 'habits:list', 'retrieve': 'habits:retrieve'},
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput and latency of the ASGI (config/asgi.py, async views) and WSGI (config/wsgi.py, '
+            'sync views) deployments under many concurrent keep-alive connections')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deployments', nargs='+', choices=list(DEPLOYMENTS), default=list(DEPLOYMENTS),
+                            help='Deployments to measure')
+        parser.add_argument('--connections', type=int, nargs='+', default=[10, 100, 500],
+                            help='Concurrent keep-alive connections of each run')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of each run')
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help='Mean idle seconds between requests on a connection (0 for a closed loop)')
+        parser.add_argument('--endpoint', choices=['list', 'retrieve'], default='list', help='Measured endpoint')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes')
+        parser.add_argument('--threads', type=int, default=8, help='Threads of each WSGI worker')
+        parser.add_argument('--port', type=int, default=8765, help='Port of the started servers')
+        parser.add_argument('--asgi-url', type=str, help='Measure an already running ASGI server instead')
+        parser.add_argument('--wsgi-url', type=str, help='Measure an already running WSGI server instead')
+        parser.add_argument('--output', type=str, help='Write JSON results to this file')
+
+    def handle(self, *args, **options):
+        habit = Habit.objects.filter(user__isnull=False).order_by('id').only('user_id').first()
+        if habit is None:
+            raise CommandError('No habits to request, run seed_load first')
+        user = User.objects.get(pk=habit.user_id)
+        token = str(UserTokenObtainPairSerializer.get_token(user).access_token)
+
+        results = {}
+        for name in options['deployments']:
+            deployment = DEPLOYMENTS[name]
+            route = deployment[options['endpoint']]
+            path = reverse(route, args=[habit.pk]) if options['endpoint'] == 'retrieve' else reverse(route)
+            url = options[f'{name}_url']
+            server = None
+            if url is None:
+                if importlib.util.find_spec(deployment['module']) is None:
+                    raise CommandError(f'{deployment["module"]} is not installed: install the dev dependencies '
+                                       f'(poetry install --with dev) or pass --{name}-url of a running server')
+                url = f'http://127.0.0.1:{options["port"]}'
+                server = self.start_server(name, options)
+            try:
+                host, port = self.get_address(url)
+                self.wait_for_server(host, port, server)
+                results[name] = {}
+                for connections in options['connections']:
+                    result = asyncio.run(run_load(host, port, path, token, connections,
+                                                  options['duration'], options['think_time']))
+                    results[name][connections] = result
+                    self.stdout.write(
+                        f'{name} {connections:>5} connections  {result["rps"]:8.1f} req/s  '
+                        f'p50 {result["p50_ms"]:8.2f} ms  p99 {result["p99_ms"]:8.2f} ms  '
+                        f'errors {result["errors"]}  connected {result["connected"]}')
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'options': {key: options[key] for key in ('duration', 'think_time', 'endpoint',
+                                                                     'workers', 'threads')},
+                           'results': results}, file, indent=2)
+
+    def start_server(self, name, options):
+        address = f'127.0.0.1:{options["port"]}'
+        if name == 'asgi':
+            command = ['-m', 'uvicorn', 'config.asgi:application', '--host', '127.0.0.1',
+                       '--port', str(options['port']), '--workers', str(options['workers']),
+                       '--no-access-log', '--log-level', 'warning']
+        else:
+            # gthread держит keep-alive соединения в потоках: одновременно обслуживается workers * threads запросов
+            command = ['-m', 'gunicorn', 'config.wsgi:application', '--bind', address,
+                       '--workers', str(options['workers']), '--worker-class', 'gthread',
+                       '--threads', str(options['threads']), '--keep-alive', '75', '--log-level', 'warning']
+        return subprocess.Popen([sys.executable, *command])
+
+    @staticmethod
+    def get_address(url):
+        parts = urlsplit(url)
+        return parts.hostname, parts.port or 80
+
+    @staticmethod
+    def wait_for_server(host, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError(f'Server exited with code {server.returncode}')
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Server at {host}:{port} did not start in {timeout} s')
+
+
+async def run_load(host, port, path, token, connections, duration, think_time):
+    """
+    Нагрузка connections keep-alive соединениями в течение duration секунд.
+
+    Каждое соединение открывается один раз и отправляет запросы последовательно, между ответом и
+    следующим запросом простаивая в среднем think_time секунд, как мобильные клиенты.
+    """
+    request = (f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAuthorization: Bearer {token}\r\n'
+               f'Connection: keep-alive\r\n\r\n').encode()
+    timings, errors, connected = [], [], []
+    deadline = time.monotonic() + duration
+
+    async def connection():
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError as exc:
+            errors.append(str(exc))
+            return
+        connected.append(True)
+        # Соединения начинают в разные моменты, чтобы запросы не приходили волнами
+        await asyncio.sleep(random.uniform(0, think_time))
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                writer.write(request)
+                status = await read_response(reader)
+                if status == 200:
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors.append(f'HTTP {status}')
+                if think_time:
+                    await asyncio.sleep(random.expovariate(1 / think_time))
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors.append(str(exc) or type(exc).__name__)
+        finally:
+            writer.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    elapsed = time.monotonic() - started
+
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else [0] * 99
+    return {
+        'requests': len(timings),
+        'rps': len(timings) / elapsed,
+        'p50_ms': percentiles[49],
+        'p95_ms': percentiles[94],
+        'p99_ms': percentiles[98],
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:5],
+        'connected': len(connected),
+    }
+
+
+async def read_response(reader):
+    """Читает ответ HTTP/1.1 с Content-Length и возвращает его статус."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Connection closed by server')
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
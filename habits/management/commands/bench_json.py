@@ -0,0 +1,77 @@
+import io
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from habits.models import Habit
+from habits.seeding import seed_habits, seed_users
+from habits.serializers import HabitValuesSerializer
+from src.benchmarks import rolled_back
+from src.parsers import FastJSONParser
+from src.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = ('Compare the default DRF JSON renderer/parser with the orjson-backed ones on habit list payloads '
+            '(habits seeded for the run are rolled back)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000], help='List sizes to measure')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs of each measurement')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed, FastJSONRenderer falls back to the standard json module')
+
+        # Недостающие привычки создаются только на время измерений
+        with rolled_back():
+            missing = max(options['rows']) - Habit.objects.count()
+            if missing > 0:
+                seed_habits(seed_users(100, prefix='bench_json'), missing)
+            results = self.measure(options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f'{result["rows"]:>6} rows ({result["bytes"]} bytes): '
+                f'render {result["render_default_ms"]:.2f} -> {result["render_fast_ms"]:.2f} ms '
+                f'(x{result["render_speedup"]:.1f}), '
+                f'parse {result["parse_default_ms"]:.2f} -> {result["parse_fast_ms"]:.2f} ms '
+                f'(x{result["parse_speedup"]:.1f})')
+
+    def measure(self, options):
+        values_serializer = HabitValuesSerializer()
+        pairs = {
+            'render': (JSONRenderer().render, FastJSONRenderer().render),
+            'parse': (lambda body: JSONParser().parse(io.BytesIO(body)),
+                      lambda body: FastJSONParser().parse(io.BytesIO(body))),
+        }
+
+        results = []
+        for rows in options['rows']:
+            queryset = Habit.objects.order_by('id')[:rows]
+            data = {'next': None, 'previous': None,
+                    'results': values_serializer.to_representation(values_serializer.get_values(queryset))}
+            body = JSONRenderer().render(data)
+            assert FastJSONRenderer().render(data) == body
+            result = {'rows': rows, 'bytes': len(body)}
+            for operation, (default, fast) in pairs.items():
+                argument = data if operation == 'render' else body
+                for name, func in (('default', default), ('fast', fast)):
+                    timings = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        func(argument)
+                        timings.append(time.perf_counter() - started)
+                    result[f'{operation}_{name}_ms'] = statistics.median(timings) * 1000
+                    result[f'{operation}_{name}_mb_s'] = len(body) / statistics.median(timings) / 2 ** 20
+                result[f'{operation}_speedup'] = result[f'{operation}_default_ms'] / result[f'{operation}_fast_ms']
+            results.append(result)
+        return results
@@ -0,0 +1,42 @@
+import sys
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from habits.export import EXPORT_FORMATS, export_habits, get_export_queryset
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Stream a user's habits (or all public habits) as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--user', type=str, help='Email or id of the user whose habits are exported')
+        scope.add_argument('--public', action='store_true', help='Export all public habits')
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', type=str, help='Output file (stdout by default)')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            lookup = {'pk': options['user']} if options['user'].isdigit() else {'email': options['user']}
+            user_id = User.objects.filter(**lookup).values_list('pk', flat=True).first()
+            if user_id is None:
+                raise CommandError(f'User {options["user"]} not found')
+
+        chunks = export_habits(get_export_queryset(user_id), options['export_format'], options['chunk_size'])
+        started = time.perf_counter()
+        size = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        self.stderr.write(f'Exported {size} bytes in {time.perf_counter() - started:.2f} s')
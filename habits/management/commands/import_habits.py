@@ -0,0 +1,40 @@
+import json
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from habits.importing import IMPORT_FORMATS, HabitImporter, get_import_format, read_rows
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import habits for a user from an NDJSON or CSV file (linked_habit refers to ids within the file)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='File to import, "-" for stdin')
+        parser.add_argument('--user', type=str, required=True, help='Email or id of the user receiving the habits')
+        parser.add_argument('--format', dest='import_format', choices=IMPORT_FORMATS,
+                            help='File format (by default guessed from the extension)')
+        parser.add_argument('--chunk-size', type=int, help='Rows validated and inserted at a time')
+        parser.add_argument('--errors', action='store_true', help='Print rejected rows')
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['user']} if options['user'].isdigit() else {'email': options['user']}
+        user_id = User.objects.filter(**lookup).values_list('pk', flat=True).first()
+        if user_id is None:
+            raise CommandError(f'User {options["user"]} not found')
+
+        import_format = options['import_format'] or get_import_format(options['file'])
+        source = sys.stdin if options['file'] == '-' else open(options['file'], encoding='utf-8-sig', newline='')
+        try:
+            report = HabitImporter(user_id, options['chunk_size']).run(read_rows(source, import_format))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        if options['errors']:
+            for error in report['errors']:
+                self.stderr.write(f'line {error["line"]}: {json.dumps(error["errors"], ensure_ascii=False)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report["created"]} habits, rejected {report["rejected"]} rows '
+            f'in {report["seconds"]:.2f} s ({report["rows_per_second"]} rows/s)'))
@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from habits.reminders import get_reminder_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis minute-bucket reminder index from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Habits loaded per query')
+
+    def handle(self, *args, **options):
+        count = get_reminder_index().rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {count} habits'))
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management import BaseCommand
+
+from habits.reminders import get_reminder_metrics
+
+
+class Command(BaseCommand):
+    help = 'Show reminder scheduler counters (ticks, skipped and contended runs, dropped duplicates)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(get_reminder_metrics()))
@@ -0,0 +1,38 @@
+import random
+import time
+
+from django.core.management import BaseCommand
+
+from habits.seeding import seed_load
+
+
+class Command(BaseCommand):
+    help = 'Generate load-test users and habits (daily/weekly, public/private, pleasant and linked habits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create')
+        parser.add_argument('--habits-per-user', type=int, default=5, help='Average habits per user')
+        parser.add_argument('--prefix', type=str, default='load', help='Email prefix of created users')
+        parser.add_argument('--public-ratio', type=float, default=0.1)
+        parser.add_argument('--weekly-ratio', type=float, default=0.2)
+        parser.add_argument('--pleasant-ratio', type=float, default=0.2)
+        parser.add_argument('--linked-ratio', type=float, default=0.5,
+                            help='Share of useful habits linked to a pleasant habit of the same user')
+        parser.add_argument('--reward-ratio', type=float, default=0.3, help='Share of unlinked habits with a reward')
+        parser.add_argument('--notified-ratio', type=float, default=0.5, help='Share of habits already notified')
+        parser.add_argument('--chat-ratio', type=float, default=0.8, help='Share of users with a Telegram chat')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users whose habits are inserted at a time')
+        parser.add_argument('--random-seed', type=int, default=0, help='Seed for reproducible data')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = seed_load(
+            options['users'], options['habits_per_user'], prefix=options['prefix'],
+            public_ratio=options['public_ratio'], weekly_ratio=options['weekly_ratio'],
+            pleasant_ratio=options['pleasant_ratio'], linked_ratio=options['linked_ratio'],
+            reward_ratio=options['reward_ratio'], notified_ratio=options['notified_ratio'],
+            chat_ratio=options['chat_ratio'], batch_size=options['batch_size'],
+            rng=random.Random(options['random_seed']),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result["users"]} users and {result["habits"]} habits in {time.perf_counter() - started:.2f} s'))
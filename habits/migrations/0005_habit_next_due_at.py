@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:45
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Периоды привычек в днях на момент миграции
+PERIOD_DAYS = {'daily': 1, 'weekly': 7}
+
+
+def compute_next_due_at(reminder_time, periodicity, last_notification, after):
+    # Копия habits.models.compute_next_due_at на момент миграции: изменения модели не должны влиять на миграцию
+    after = timezone.localtime(after)
+    period = PERIOD_DAYS.get(periodicity, 1)
+
+    due_date = after.date()
+    if last_notification is not None:
+        due_date = max(due_date, timezone.localtime(last_notification).date() + timedelta(days=period))
+
+    due_at = timezone.make_aware(datetime.combine(due_date, reminder_time))
+    if due_at <= after:
+        due_at = timezone.make_aware(datetime.combine(due_date + timedelta(days=1), reminder_time))
+    return due_at
+
+
+def fill_next_due_at(apps, schema_editor):
+    Habit = apps.get_model('habits', 'Habit')
+    now = timezone.now()
+    habits = Habit.objects.only('time', 'periodicity', 'last_notification').iterator(chunk_size=2000)
+    batch = []
+    for habit in habits:
+        reminder_time = habit.time.replace(second=0, microsecond=0)
+        habit.next_due_at = compute_next_due_at(reminder_time, habit.periodicity, habit.last_notification, now)
+        batch.append(habit)
+        if len(batch) >= 2000:
+            Habit.objects.bulk_update(batch, ['next_due_at'])
+            batch = []
+    if batch:
+        Habit.objects.bulk_update(batch, ['next_due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_habit_last_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Дата и время следующего оповещения'),
+        ),
+        migrations.RunPython(fill_next_due_at, migrations.RunPython.noop),
+    ]
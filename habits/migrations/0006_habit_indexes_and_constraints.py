@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Сколько нарушающих ограничения привычек перечисляется в сообщении об ошибке
+MAX_REPORTED_VIOLATIONS = 100
+
+
+def check_constraint_violations(apps, schema_editor):
+    # Частичные обновления до появления ограничений могли записать привычки, нарушающие правила
+    # HabitSerializer.validate. Данные пользователей не меняем: миграция останавливается со списком
+    # таких привычек, их нужно исправить (например, в админке) и запустить migrate снова
+    Habit = apps.get_model('habits', 'Habit')
+    has_reward = models.Q(reward__isnull=False) & ~models.Q(reward='')
+    violations = Habit.objects.filter(
+        models.Q(execution_time__gt=120)
+        | (models.Q(is_pleasant=True) & (models.Q(linked_habit__isnull=False) | has_reward))
+        | (models.Q(linked_habit__isnull=False) & has_reward)
+    ).order_by('pk')
+    count = violations.count()
+    if not count:
+        return
+    rows = violations.values_list('pk', 'user_id', 'execution_time', 'is_pleasant', 'linked_habit_id', 'reward')
+    lines = [f'  id={pk} user={user_id} execution_time={execution_time} is_pleasant={is_pleasant} '
+             f'linked_habit={linked_habit_id} reward={reward!r}'
+             for pk, user_id, execution_time, is_pleasant, linked_habit_id, reward in rows[:MAX_REPORTED_VIOLATIONS]]
+    raise RuntimeError(
+        f'{count} habits violate the new constraints (execution_time <= 120; a pleasant habit has neither '
+        f'reward nor linked habit; a habit has either a reward or a linked habit). Fix them and run migrate '
+        f'again:\n' + '\n'.join(lines))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('habits', '0005_habit_next_due_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='habit',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата и время следующего оповещения'),
+        ),
+        migrations.AlterField(
+            model_name='habit',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'id'], name='habit_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['id'], name='habit_public_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('next_due_at__isnull', False)), fields=['next_due_at'], name='habit_next_due_at_idx'),
+        ),
+        migrations.RunPython(check_constraint_violations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='habit',
+            constraint=models.CheckConstraint(check=models.Q(('execution_time__isnull', True), ('execution_time__lte', 120), _connector='OR'), name='habit_execution_time_lte_120'),
+        ),
+        migrations.AddConstraint(
+            model_name='habit',
+            constraint=models.CheckConstraint(check=models.Q(('linked_habit__isnull', True), ('reward__isnull', True), ('reward', ''), _connector='OR'), name='habit_linked_habit_xor_reward'),
+        ),
+        migrations.AddConstraint(
+            model_name='habit',
+            constraint=models.CheckConstraint(check=models.Q(('is_pleasant', False), models.Q(('linked_habit__isnull', True), models.Q(('reward__isnull', True), ('reward', ''), _connector='OR')), _connector='OR'), name='habit_pleasant_without_reward'),
+        ),
+    ]
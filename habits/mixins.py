@@ -0,0 +1,61 @@
+from rest_framework.response import Response
+
+
+class OwnerQuerysetMixin:
+    """
+    Ограничивает queryset представления объектами текущего пользователя.
+
+    Проверка владельца выполняется в SQL (WHERE user_id = ...) по индексу, поэтому чужой объект
+    не загружается вовсе и для него возвращается 404. Сравниваются идентификаторы, пользователь
+    из БД не загружается.
+    """
+    owner_field = 'user_id'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.owner_field: self.request.user.id})
+
+
+class ExpandMixin:
+    """
+    Развёрнутое представление связей по параметру ?expand=linked_habit,user.
+
+    Разрешённые связи перечислены в expandable_fields. Развёрнутые связи загружаются тем же запросом
+    через select_related, поэтому количество запросов не зависит от размера страницы.
+    """
+    expandable_fields = ('linked_habit', 'user')
+    # Разворачивать приватные связанные привычки текущего пользователя (см. HabitSerializer.can_expand)
+    expand_own_private = True
+
+    def get_expand(self):
+        requested = self.request.query_params.get('expand', '').split(',')
+        return [name for name in self.expandable_fields if name in requested]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expand()
+        return queryset.select_related(*expand) if expand else queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        context['viewer_id'] = self.request.user.id if self.expand_own_private else None
+        return context
+
+
+class ValuesListMixin:
+    """
+    Список без развёрнутых связей отдаётся через values_serializer_class (без объектов моделей).
+
+    С параметром expand используется обычный сериализатор представления.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.get_expand():
+            return super().list(request, *args, **kwargs)
+        values_serializer = self.values_serializer_class()
+        queryset = values_serializer.get_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(queryset))
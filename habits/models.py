@@ -1,14 +1,24 @@
+from datetime import datetime, timedelta
+
 from django.db import models
+from django.utils import timezone
 
 from config import settings
 from src.constants import NULLABLE
 
 
 class Habit(models.Model):
+    # Интервал между оповещениями для каждой периодичности
+    PERIOD_DAYS = {'daily': 1, 'weekly': 7}
+
+    # Поля, от которых зависит время следующего оповещения (next_due_at)
+    SCHEDULE_FIELDS = ('time', 'periodicity', 'last_notification')
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         verbose_name='Пользователь',
+        db_index=False,  # покрывается составным индексом habit_user_id_idx
         **NULLABLE)
     place = models.CharField(max_length=255, verbose_name='Место', **NULLABLE)
     time = models.TimeField(auto_now_add=True, verbose_name='Время')
@@ -26,6 +36,109 @@ class Habit(models.Model):
     is_public = models.BooleanField(default=False, verbose_name='Признак публичности')
     # дата и время последнего оповещения привычки
     last_notification = models.DateTimeField(**NULLABLE, verbose_name='Дата и время последнего оповещения')
+    # дата и время следующего оповещения, пересчитывается при каждом сохранении привычки
+    next_due_at = models.DateTimeField(
+        editable=False,
+        verbose_name='Дата и время следующего оповещения',
+        **NULLABLE)
+
+    class Meta:
+        indexes = [
+            # Список привычек пользователя: WHERE user_id = ... ORDER BY id (пагинация по курсору)
+            models.Index(fields=['user', 'id'], name='habit_user_id_idx'),
+            # Лента публичных привычек: WHERE is_public ORDER BY id
+            models.Index(fields=['id'], condition=models.Q(is_public=True), name='habit_public_feed_idx'),
+            # Поиск наступивших оповещений: WHERE next_due_at <= ...; приостановленные привычки не индексируются
+            models.Index(fields=['next_due_at'], condition=models.Q(next_due_at__isnull=False),
+                         name='habit_next_due_at_idx'),
+        ]
+        constraints = [
+            # Те же правила, что проверяет HabitSerializer.validate, - для записей в обход API
+            models.CheckConstraint(
+                check=models.Q(execution_time__isnull=True) | models.Q(execution_time__lte=120),
+                name='habit_execution_time_lte_120'),
+            models.CheckConstraint(
+                check=models.Q(linked_habit__isnull=True) | models.Q(reward__isnull=True) | models.Q(reward=''),
+                name='habit_linked_habit_xor_reward'),
+            models.CheckConstraint(
+                check=models.Q(is_pleasant=False) | (
+                    models.Q(linked_habit__isnull=True) & (models.Q(reward__isnull=True) | models.Q(reward=''))),
+                name='habit_pleasant_without_reward'),
+        ]
 
     def __str__(self):
         return self.action
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженные из БД значения, чтобы знать, что изменилось при сохранении
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @property
+    def was_public(self):
+        """Была ли привычка публичной на момент загрузки из БД."""
+        return getattr(self, '_loaded_values', {}).get('is_public', False)
+
+    def save(self, *args, **kwargs):
+        # Время следующего оповещения сохраняется вместе с остальными полями, если расписание изменилось
+        update_fields = kwargs.get('update_fields')
+        if self.update_next_due_at() and update_fields:
+            kwargs['update_fields'] = {*update_fields, 'next_due_at'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: self.__dict__[field.attname]
+                               for field in self._meta.concrete_fields if field.attname in self.__dict__}
+
+    def update_next_due_at(self):
+        """
+        Пересчитывает next_due_at новой привычки или привычки, у которой изменились time, periodicity
+        или last_notification. Возвращает True, если время пересчитано.
+
+        Правка остальных полей не сдвигает время, назначенное при захвате тиком, а приостановленная
+        (next_due_at пуст у загруженной из БД привычки) привычка не возобновляется.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if not self._state.adding and loaded is not None:
+            if 'next_due_at' in loaded and loaded['next_due_at'] is None:
+                return False
+            if not any(field in loaded and getattr(self, field) != loaded[field] for field in self.SCHEDULE_FIELDS):
+                return False
+        self.next_due_at = self.get_next_due_at()
+        return True
+
+    def get_reminder_time(self):
+        """Время оповещения привычки с учётом того, что при создании поле time заполняется автоматически."""
+        if self._state.adding or self.time is None:
+            return timezone.localtime().time().replace(second=0, microsecond=0)
+        return self._meta.get_field('time').to_python(self.time).replace(second=0, microsecond=0)
+
+    def get_next_due_at(self, after=None, last_notification=None):
+        """
+        Ближайшие дата и время оповещения позже момента after (по умолчанию - текущего).
+
+        Если last_notification не передан, используется сохранённое значение поля.
+        """
+        if last_notification is None:
+            last_notification = self.last_notification
+        return compute_next_due_at(self.get_reminder_time(), self.periodicity, last_notification, after)
+
+
+def compute_next_due_at(reminder_time, periodicity, last_notification=None, after=None):
+    """
+    Ближайшие дата и время оповещения привычки позже момента after.
+
+    Время привычки трактуется в часовом поясе проекта (TIME_ZONE). Оповещение не назначается раньше,
+    чем через период (1 или 7 дней) после последнего оповещения.
+    """
+    after = timezone.localtime(after or timezone.now())
+    period = Habit.PERIOD_DAYS.get(periodicity, 1)
+
+    due_date = after.date()
+    if last_notification is not None:
+        due_date = max(due_date, timezone.localtime(last_notification).date() + timedelta(days=period))
+
+    due_at = timezone.make_aware(datetime.combine(due_date, reminder_time))
+    if due_at <= after:
+        due_at = timezone.make_aware(datetime.combine(due_date + timedelta(days=1), reminder_time))
+    return due_at
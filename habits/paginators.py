@@ -0,0 +1,105 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class HabitCursorPagination(CursorPagination):
+    """
+    Пагинация списков привычек по курсору.
+
+    Страницы выбираются по индексу первичного ключа (WHERE id > ... ORDER BY id LIMIT ...) без OFFSET
+    и без подсчёта общего количества строк, поэтому время ответа не зависит от номера страницы.
+    Размер страницы задаётся параметром page_size, но не больше max_page_size.
+
+    Асинхронные представления используют apaginate_queryset: те же страницы и ссылки,
+    строки выбираются асинхронной итерацией по queryset.
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Срез queryset для курсора запроса: строки страницы и ещё одна, по которой определяется следующая страница.
+
+        Первая половина CursorPagination.paginate_queryset - до выборки строк.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            # Курсор назад XOR обратная сортировка
+            if self.cursor.reverse != is_reversed:
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Страница и позиции соседних страниц по выбранным строкам.
+
+        Вторая половина CursorPagination.paginate_queryset - после выборки строк.
+        """
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # Строки выбраны в обратном порядке, возвращаем их в порядке сортировки
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -1,8 +1,2 @@
-from rest_framework.generics import ListAPIView
-from .models import Habit
-from .serializers import HabitSerializer
-
-
-class PublicHabitListView(ListAPIView):
-    queryset = Habit.objects.filter(is_public=True)
-    serializer_class = HabitSerializer
+# Лента публичных привычек реализована в habits.api, имя оставлено для совместимости
+from habits.api import PublicHabitList as PublicHabitListView  # noqa: F401
@@ -0,0 +1,308 @@
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.db.models.functions import Coalesce, Mod
+from redis.exceptions import LockNotOwnedError
+
+from habits.models import Habit
+
+logger = logging.getLogger(__name__)
+
+# Счётчики работы планировщика оповещений
+REMINDER_METRICS = (
+    'ticks',  # запущенные тики
+    'ticks_skipped',  # тики, пропущенные из-за выполняющегося тика
+    'shards',  # обработанные шарды
+    'shards_skipped',  # шарды, пропущенные из-за выполняющегося шарда предыдущего тика
+    'duplicates',  # повторные оповещения, отброшенные по ключу идемпотентности
+)
+
+
+def get_shard_queryset(shard, shard_count):
+    """
+    Привычки, относящиеся к шарду с номером shard из shard_count.
+
+    Привычки распределяются по остатку от деления идентификатора пользователя, поэтому все привычки
+    одного пользователя (и одного чата Telegram) попадают в один шард.
+    """
+    queryset = Habit.objects.all()
+    if shard_count > 1:
+        queryset = queryset.alias(shard=Mod(Coalesce('user_id', 'id'), shard_count)).filter(shard=shard)
+    return queryset
+
+
+def claim_due_habits(shard, shard_count, now, habit_ids=None):
+    """
+    Захватывает привычки шарда, время оповещения которых наступило к моменту now.
+
+    В одной транзакции строки блокируются (уже заблокированные другим тиком пропускаются) и им сразу
+    назначается время следующего оповещения, как если бы оповещение было отправлено в момент now.
+    Поэтому каждая привычка захватывается ровно одним тиком за период, даже если шарды
+    предыдущего тика ещё выполняются. Возвращает идентификаторы захваченных привычек.
+
+    Если переданы habit_ids (кандидаты из индекса оповещений), проверяются только они.
+    """
+    queryset = get_shard_queryset(shard, shard_count).filter(next_due_at__lte=now)
+    if habit_ids is not None:
+        queryset = queryset.filter(pk__in=habit_ids)
+    with transaction.atomic():
+        habits = list(
+            queryset
+            .only('user_id', 'time', 'periodicity', 'last_notification')
+            .order_by('pk')
+            .select_for_update(skip_locked=True)
+        )
+        for habit in habits:
+            habit.next_due_at = habit.get_next_due_at(after=now, last_notification=now)
+        Habit.objects.bulk_update(habits, ['next_due_at'])
+
+    # bulk_update не отправляет сигналов, поэтому индекс обновляем сами
+    if habits and settings.REMINDER_INDEX_ENABLED:
+        get_reminder_index().add(habits)
+    return [habit.pk for habit in habits]
+
+
+def get_cache_redis_client():
+    """Клиент Redis кэша по умолчанию или None, если кэш хранится не в Redis (тесты, локальная разработка)."""
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)
+    return None
+
+
+@contextmanager
+def reminder_lock(name, timeout=None):
+    """
+    Распределённая блокировка в Redis кэша: ключ с временем жизни ставится через SET NX и снимается
+    скриптом Lua, который удаляет ключ, только если в нём токен этого процесса (redis.lock.Lock).
+    Поэтому истёкшая и перехваченная другим процессом блокировка не снимается чужим процессом.
+
+    Возвращает в блок with признак того, что блокировка захвачена. Если блокировку держит другой
+    процесс, блок выполняется с False, и вызывающий код должен пропустить работу.
+    Для кэша не в Redis используется атомарный add ключа кэша.
+    """
+    key = cache.make_and_validate_key(f'habits:reminder:lock:{name}')
+    timeout = timeout or settings.REMINDER_LOCK_TIMEOUT
+    client = get_cache_redis_client()
+    if client is None:
+        token = uuid.uuid4().hex
+        acquired = cache.add(key, token, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired and cache.get(key) == token:
+                cache.delete(key)
+        return
+
+    lock = client.lock(key, timeout=timeout, blocking=False)
+    acquired = lock.acquire()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockNotOwnedError:
+                # Блокировка истекла раньше, чем закончилась работа
+                pass
+
+
+def mark_notified(habit_ids, period):
+    """
+    Отмечает оповещение привычек за период и возвращает идентификаторы, ещё не отмеченные ранее.
+
+    Ключ идемпотентности (привычка, период) ставится атомарно, поэтому повторная доставка той же
+    задачи или повторный запуск тика не приводят к повторной отправке.
+    """
+    timeout = (max(Habit.PERIOD_DAYS.values()) + 1) * 24 * 60 * 60
+    fresh = [habit_id for habit_id in habit_ids
+             if cache.add(f'habits:reminder:sent:{habit_id}:{period}', 1, timeout)]
+    if len(fresh) < len(habit_ids):
+        incr_metric('duplicates', len(habit_ids) - len(fresh))
+    return fresh
+
+
+def incr_metric(name, delta=1):
+    key = f'habits:reminder:metrics:{name}'
+    cache.add(key, 0, timeout=None)
+    cache.incr(key, delta)
+
+
+def get_reminder_metrics():
+    values = cache.get_many([f'habits:reminder:metrics:{name}' for name in REMINDER_METRICS])
+    return {name: values.get(f'habits:reminder:metrics:{name}', 0) for name in REMINDER_METRICS}
+
+
+class ReminderIndex:
+    """
+    Индекс оповещений в Redis: привычки, разложенные по минутам суток в UTC.
+
+    Ежедневные привычки хранятся в множествах daily:<минута>, еженедельные - в weekly:<день недели>:<минута>,
+    где минута и день недели берутся из next_due_at в UTC. Элемент множества - строка
+    "<ключ шарда>:<id привычки>", чтобы тик мог распределить кандидатов по шардам без запросов к БД.
+    Хэш slots хранит текущее множество каждой привычки для удаления из старой корзины при изменении.
+    """
+    PREFIX = 'habits:reminder:index'
+
+    def __init__(self, client=None):
+        self.client = client or redis.Redis.from_url(settings.REMINDER_INDEX_URL)
+        self.slots_key = f'{self.PREFIX}:slots'
+        self.cursors_key = f'{self.PREFIX}:cursors'
+
+    @classmethod
+    def get_bucket(cls, periodicity, due_at):
+        due_at = due_at.astimezone(dt_timezone.utc)
+        minute = due_at.hour * 60 + due_at.minute
+        if periodicity == 'weekly':
+            return f'{cls.PREFIX}:weekly:{due_at.weekday()}:{minute}'
+        return f'{cls.PREFIX}:daily:{minute}'
+
+    @staticmethod
+    def get_member(habit):
+        return f'{habit.user_id or habit.pk}:{habit.pk}'
+
+    def add(self, habits):
+        """Переносит привычки в корзины, соответствующие их next_due_at (без next_due_at - удаляет)."""
+        habits = list(habits)
+        if not habits:
+            return
+        old_buckets = self.client.hmget(self.slots_key, [habit.pk for habit in habits])
+        pipe = self.client.pipeline(transaction=False)
+        for habit, old_bucket in zip(habits, old_buckets):
+            member = self.get_member(habit)
+            bucket = self.get_bucket(habit.periodicity, habit.next_due_at) if habit.next_due_at else None
+            old_bucket = old_bucket.decode() if old_bucket else None
+            if old_bucket and old_bucket != bucket:
+                pipe.srem(old_bucket, member)
+            if bucket:
+                pipe.sadd(bucket, member)
+                pipe.hset(self.slots_key, habit.pk, bucket)
+            else:
+                pipe.hdel(self.slots_key, habit.pk)
+        pipe.execute()
+
+    def remove(self, habit_id, member):
+        """Удаляет привычку из индекса: member - её элемент множества (get_member), посчитанный до удаления."""
+        old_bucket = self.client.hget(self.slots_key, habit_id)
+        pipe = self.client.pipeline(transaction=False)
+        if old_bucket:
+            pipe.srem(old_bucket, member)
+        pipe.hdel(self.slots_key, habit_id)
+        pipe.execute()
+
+    def get_due(self, start, end):
+        """
+        Кандидаты на оповещение в минутах (start, end] - пары (ключ шарда, id привычки).
+
+        Для каждой минуты проверяются две корзины (ежедневная и еженедельная), все корзины
+        объединяются одной командой SUNION.
+        """
+        buckets = []
+        minute = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        while minute <= end:
+            buckets.append(self.get_bucket('daily', minute))
+            buckets.append(self.get_bucket('weekly', minute))
+            minute += timedelta(minutes=1)
+        if not buckets:
+            return []
+        return [tuple(int(part) for part in member.split(b':')) for member in self.client.sunion(buckets)]
+
+    def get_cursors(self, shard_count):
+        """Последние минуты, обработанные шардами (None - для шардов без отметки)."""
+        values = self.client.hmget(self.cursors_key, [f'{shard}:{shard_count}' for shard in range(shard_count)])
+        return [datetime.fromtimestamp(int(value), dt_timezone.utc) if value else None for value in values]
+
+    def set_cursors(self, shards, shard_count, minute):
+        """Отмечает минуту minute обработанной шардами shards."""
+        if shards:
+            self.client.hset(self.cursors_key,
+                             mapping={f'{shard}:{shard_count}': int(minute.timestamp()) for shard in shards})
+
+    def rebuild(self, chunk_size=2000):
+        """Полностью пересобирает индекс по данным БД. Возвращает количество проиндексированных привычек."""
+        pipe = self.client.pipeline(transaction=False)
+        for key in self.client.scan_iter(f'{self.PREFIX}:*'):
+            if key.decode() != self.cursors_key:
+                pipe.delete(key)
+        pipe.execute()
+
+        count = 0
+        batch = []
+        habits = Habit.objects.filter(next_due_at__isnull=False).only('user_id', 'periodicity', 'next_due_at')
+        for habit in habits.iterator(chunk_size=chunk_size):
+            batch.append(habit)
+            if len(batch) >= chunk_size:
+                self.add(batch)
+                count += len(batch)
+                batch = []
+        self.add(batch)
+        return count + len(batch)
+
+
+_index = None
+
+
+def get_reminder_index():
+    global _index
+    if _index is None:
+        _index = ReminderIndex()
+    return _index
+
+
+def get_due_from_index(now, shard_count):
+    """
+    Кандидаты на оповещение из индекса, разложенные по шардам: {шард: [id привычки, ...] или None}.
+
+    У каждого шарда своя отметка последней обработанной минуты, её сдвигает сам шард после захвата
+    привычек (mark_shard_processed). Шард, который не выполнился (ошибка, пропуск из-за блокировки),
+    на следующем тике получает кандидатов и за пропущенные минуты. Отметки шардов без кандидатов
+    сдвигаются сразу.
+
+    Для шарда возвращается None - тогда он выполняет поиск по БД и подбирает привычки, пропущенные
+    индексом, - если его отметка отсутствует (первый запуск, потеря данных Redis) или отстаёт больше
+    чем на REMINDER_INDEX_MAX_GAP минут, а также раз в REMINDER_INDEX_SWEEP_MINUTES минут.
+    """
+    index = get_reminder_index()
+    minute = now.replace(second=0, microsecond=0)
+    cursors = index.get_cursors(shard_count)
+    sweep = minute.minute % settings.REMINDER_INDEX_SWEEP_MINUTES == 0
+    max_gap = timedelta(minutes=settings.REMINDER_INDEX_MAX_GAP)
+
+    habit_ids_by_shard = {}
+    pending = []
+    for shard, cursor in enumerate(cursors):
+        if cursor is not None and cursor >= minute:
+            habit_ids_by_shard[shard] = []
+        elif sweep or cursor is None or minute - cursor > max_gap:
+            habit_ids_by_shard[shard] = None
+        else:
+            habit_ids_by_shard[shard] = []
+            pending.append(shard)
+    if not pending:
+        return habit_ids_by_shard
+
+    # Минуты всех отстающих шардов читаются одним SUNION с самой ранней отметки. Лишние кандидаты
+    # шардов с более поздней отметкой отбрасываются при захвате: их next_due_at уже в будущем
+    for shard_key, habit_id in index.get_due(min(cursors[shard] for shard in pending), minute):
+        shard = shard_key % shard_count
+        if shard in pending:
+            habit_ids_by_shard[shard].append(habit_id)
+    index.set_cursors([shard for shard in pending if not habit_ids_by_shard[shard]], shard_count, minute)
+    return habit_ids_by_shard
+
+
+def mark_shard_processed(shard, shard_count, now):
+    """Отмечает минуту тика now обработанной шардом."""
+    # Привычки уже захвачены, поэтому ошибка Redis не должна помешать отправке: без отметки
+    # следующий тик ещё раз прочитает эти минуты, а захват отбросит уже обработанные привычки
+    try:
+        get_reminder_index().set_cursors([shard], shard_count, now.replace(second=0, microsecond=0))
+    except redis.RedisError:
+        logger.exception('Не удалось отметить обработку шарда %s/%s', shard, shard_count)
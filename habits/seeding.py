@@ -0,0 +1,123 @@
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from habits.models import Habit, compute_next_due_at
+from users.models import User
+
+
+def seed_users(count, batch_size=5000, prefix='seed', chat_ratio=0, rng=None):
+    """
+    Создаёт count пользователей без пароля пачками bulk_create и возвращает их идентификаторы.
+
+    Доле chat_ratio пользователей задаётся чат Telegram.
+    """
+    rng = rng or random.Random(0)
+    password = make_password(None)
+    start = User.objects.count()
+    for offset in range(0, count, batch_size):
+        User.objects.bulk_create(
+            User(email=f'{prefix}_{start + i}@example.com', password=password,
+                 tlg_chat_id=str(100000 + start + i) if rng.random() < chat_ratio else None)
+            for i in range(offset, min(offset + batch_size, count))
+        )
+    return list(User.objects.filter(email__startswith=f'{prefix}_').values_list('id', flat=True))
+
+
+def seed_habits(user_ids, count, batch_size=10000, public_ratio=0.1, weekly_ratio=0.2, rng=None):
+    """
+    Создаёт count привычек, равномерно распределённых по пользователям user_ids, пачками bulk_create.
+
+    Время оповещения, периодичность и публичность выбираются случайно, next_due_at рассчитывается сразу.
+    Поле time при bulk_create заполняется временем создания (auto_now_add), случайное время оповещения
+    хранится только в next_due_at - этого достаточно для нагрузки на списки и тик оповещений.
+    """
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    created = 0
+    while created < count:
+        habits = []
+        for _ in range(min(batch_size, count - created)):
+            periodicity = 'weekly' if rng.random() < weekly_ratio else 'daily'
+            reminder_time = datetime.time(rng.randrange(24), rng.randrange(60))
+            habits.append(Habit(
+                user_id=rng.choice(user_ids),
+                action=f'Habit {created + len(habits)}',
+                place='Home',
+                periodicity=periodicity,
+                execution_time=rng.randrange(10, 121),
+                is_public=rng.random() < public_ratio,
+                next_due_at=compute_next_due_at(reminder_time, periodicity, after=now),
+            ))
+        Habit.objects.bulk_create(habits)
+        created += len(habits)
+    return created
+
+
+def seed_load(user_count, habits_per_user=5, prefix='load', public_ratio=0.1, weekly_ratio=0.2,
+              pleasant_ratio=0.2, linked_ratio=0.5, reward_ratio=0.3, notified_ratio=0.5, chat_ratio=0.8,
+              batch_size=1000, rng=None):
+    """
+    Создаёт пользователей и привычки с распределением, близким к реальному.
+
+    У каждого пользователя в среднем habits_per_user привычек. Доля pleasant_ratio из них - приятные,
+    остальные с вероятностью linked_ratio связаны с приятной привычкой того же пользователя, иначе
+    с вероятностью reward_ratio имеют вознаграждение. Доля notified_ratio привычек уже получала оповещения,
+    доле chat_ratio пользователей задан чат Telegram. Как и в seed_habits, время оповещения хранится
+    только в next_due_at.
+
+    Возвращает {'users': ..., 'habits': ...}.
+    """
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    user_ids = seed_users(user_count, batch_size=batch_size * 5, prefix=prefix, chat_ratio=chat_ratio, rng=rng)
+
+    numbers = itertools.count()
+
+    def make_habit(user_id, **fields):
+        periodicity = 'weekly' if rng.random() < weekly_ratio else 'daily'
+        reminder_time = datetime.time(rng.randrange(24), rng.randrange(60))
+        last_notification = None
+        if rng.random() < notified_ratio:
+            last_notification = now - datetime.timedelta(days=rng.randrange(Habit.PERIOD_DAYS[periodicity]),
+                                                         minutes=rng.randrange(24 * 60))
+        return Habit(
+            user_id=user_id,
+            action=f'Habit {next(numbers)}',
+            place=rng.choice(('Home', 'Office', 'Gym', 'Park')),
+            periodicity=periodicity,
+            execution_time=rng.randrange(10, 121),
+            is_public=rng.random() < public_ratio,
+            last_notification=last_notification,
+            next_due_at=compute_next_due_at(reminder_time, periodicity, last_notification, after=now),
+            **fields,
+        )
+
+    created = 0
+    for offset in range(0, len(user_ids), batch_size):
+        counts = {user_id: rng.randint(0, 2 * habits_per_user) for user_id in user_ids[offset:offset + batch_size]}
+        # Сначала приятные привычки: их идентификаторы нужны для связей
+        pleasant = [make_habit(user_id, is_pleasant=True)
+                    for user_id, count in counts.items()
+                    for _ in range(sum(rng.random() < pleasant_ratio for _ in range(count)))]
+        Habit.objects.bulk_create(pleasant)
+        pleasant_ids = {}
+        for habit in pleasant:
+            pleasant_ids.setdefault(habit.user_id, []).append(habit.pk)
+            counts[habit.user_id] -= 1
+
+        habits = []
+        for user_id, count in counts.items():
+            for _ in range(count):
+                fields = {}
+                if user_id in pleasant_ids and rng.random() < linked_ratio:
+                    fields['linked_habit_id'] = rng.choice(pleasant_ids[user_id])
+                elif rng.random() < reward_ratio:
+                    fields['reward'] = rng.choice(('Coffee', 'Episode', 'Walk'))
+                habits.append(make_habit(user_id, **fields))
+        Habit.objects.bulk_create(habits)
+        created += len(pleasant) + len(habits)
+    return {'users': len(user_ids), 'habits': created}
@@ -1,24 +1,222 @@
-from rest_framework import serializers
+from django.db import transaction
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from habits.models import Habit
+from habits.signals import habits_bulk_saved
+from users.models import User
+
+
+# Сериализатор списка привычек: запись всех привычек одним запросом
+class HabitListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        habits = [Habit(**attrs) for attrs in validated_data]
+        # bulk_create не вызывает save(), поэтому время следующего оповещения считаем здесь
+        for habit in habits:
+            habit.next_due_at = habit.get_next_due_at()
+        with transaction.atomic():
+            Habit.objects.bulk_create(habits)
+            habits_bulk_saved(habits)
+        return habits
+
+    def update(self, instances, validated_data):
+        """Обновляет привычки instances значениями validated_data (списки в одном порядке)."""
+        fields = set()
+        for habit, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(habit, attr, value)
+            fields.update(attrs)
+            # Как в Habit.save: время оповещения пересчитывается, только если изменилось расписание
+            if habit.update_next_due_at():
+                fields.add('next_due_at')
+        with transaction.atomic():
+            if fields:
+                Habit.objects.bulk_update(instances, fields)
+            habits_bulk_saved(instances)
+        return instances
+
+
+# Сериализатор связанной привычки для развёрнутого представления
+class LinkedHabitSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Habit
+        fields = ['id', 'place', 'time', 'action', 'is_pleasant', 'periodicity', 'execution_time', 'is_public']
+
+
+# Сериализатор владельца привычки для развёрнутого представления
+class HabitUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'email']
 
 
 # Сериализатор привычек
 class HabitSerializer(serializers.ModelSerializer):
+    # Связи, которые можно развернуть параметром ?expand= вместо вывода идентификатора
+    EXPANDABLE_FIELDS = {
+        'linked_habit': LinkedHabitSerializer,
+        'user': HabitUserSerializer,
+    }
+
     class Meta:
         model = Habit
-        fields = '__all__'
+        # next_due_at - служебное поле планировщика: оно меняется при оповещениях без изменения привычки
+        # пользователем и не должно влиять на кэш списков, ETag и выгрузки
+        exclude = ('next_due_at',)
+        # Время задаётся при обновлении привычки; при создании модель заполняет его сама (auto_now_add).
+        # Владелец - всегда текущий пользователь, представления передают его идентификатор при сохранении
+        extra_kwargs = {'time': {'read_only': False, 'required': False}, 'user': {'read_only': True}}
+        list_serializer_class = HabitListSerializer
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and 'linked_habit' in fields:
+            # Связать можно только свою привычку: чужая (в том числе приватная) считается несуществующей
+            fields['linked_habit'].queryset = Habit.objects.filter(user_id=request.user.id)
+        return fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Разворачиваем связи, перечисленные представлением в контексте (они загружены через select_related)
+        for name in self.context.get('expand', ()):
+            value = getattr(instance, name)
+            if value is not None and self.can_expand(name, value):
+                data[name] = self.EXPANDABLE_FIELDS[name](value, context=self.context).data
+        return data
+
+    def can_expand(self, name, value):
+        """
+        Можно ли вывести связь объектом. Иначе остаётся идентификатор, как без expand.
+
+        Связанная привычка разворачивается, только если она публичная или принадлежит пользователю
+        из context['viewer_id'] (его нет в ленте публичных привычек, страницы которой общие для всех).
+        """
+        if name != 'linked_habit' or value.is_public:
+            return True
+        viewer_id = self.context.get('viewer_id')
+        return viewer_id is not None and value.user_id == viewer_id
+
+    def update(self, instance, validated_data):
+        # Записываем только поля, значения которых отличаются от загруженных из БД
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        loaded = getattr(instance, '_loaded_values', None)
+        if loaded is None:
+            instance.save()
+            return instance
+        changed = [field.name for field in instance._meta.concrete_fields
+                   if field.attname in loaded and getattr(instance, field.attname) != loaded[field.attname]]
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
+
+    def get_final_value(self, data, name):
+        """
+        Значение поля после сохранения: из data, а если его там нет (частичное обновление) - из self.instance.
+
+        Для связанной привычки из instance берётся идентификатор, чтобы не загружать её из БД.
+        """
+        if name in data:
+            return data[name]
+        if not isinstance(self.instance, Habit):
+            return None
+        return self.instance.linked_habit_id if name == 'linked_habit' else getattr(self.instance, name)
 
     def validate(self, data):
-        if data.get('linked_habit') and data.get('reward'):
+        # Правила (и ограничения БД) относятся к привычке целиком, поэтому при частичном обновлении
+        # проверяется итоговое состояние, а не только переданные поля
+        linked_habit = self.get_final_value(data, 'linked_habit')
+        reward = self.get_final_value(data, 'reward')
+        is_pleasant = self.get_final_value(data, 'is_pleasant')
+
+        if linked_habit and reward:
             raise serializers.ValidationError('Нельзя одновременно указывать связанную привычку и вознаграждение')
         execution_time = data.get('execution_time')
         if execution_time is not None and execution_time > 120:
             raise serializers.ValidationError('Время выполнения не может быть больше 120 секунд')
 
+        # Ранее сохранённая связанная привычка уже проверена, проверяем только новую
         if data.get('linked_habit') and not data.get('linked_habit').is_pleasant:
             raise serializers.ValidationError(
                 'В связанные привычки могут попадать только привычки с признаком приятной')
-        if data.get('is_pleasant') and (data.get('reward') or data.get('linked_habit')):
+        if is_pleasant and (reward or linked_habit):
             raise serializers.ValidationError('У приятной привычки не может быть вознаграждения или связанной привычки')
 
         return data
+
+
+# Сериализатор строк импорта привычек
+class HabitImportSerializer(HabitSerializer):
+    """
+    Проверка строки импорта теми же правилами, что и у HabitSerializer.
+
+    Идентификатор и владелец из файла не используются, а linked_habit ссылается на id привычки
+    в том же файле: context['habits'] - словарь {id из файла: (pk созданной привычки, is_pleasant)}.
+    """
+
+    class Meta(HabitSerializer.Meta):
+        exclude = ('id', 'user', 'linked_habit', 'next_due_at')
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        linked_habit = data.get('linked_habit')
+        if linked_habit not in (None, ''):
+            habit = self.context['habits'].get(str(linked_habit))
+            if habit is None:
+                raise serializers.ValidationError({'linked_habit': ['Привычка не найдена в файле.']})
+            attrs['linked_habit'] = Habit(pk=habit[0], is_pleasant=habit[1])
+        return attrs
+
+
+# Быстрая сериализация списков привычек только для чтения
+class HabitValuesSerializer:
+    """
+    Сериализация списков без создания объектов моделей и полей DRF на каждую строку.
+
+    Строки выбираются через .values() ровно по колонкам полей HabitSerializer, а значения
+    преобразуются так же, как это делают поля сериализатора: простые типы (строки, числа, флаги,
+    идентификаторы связей) передаются как есть, дата и время в формате ISO 8601 - с часовым поясом,
+    определённым один раз на весь список, остальное - через to_representation поля.
+    Результат совпадает с HabitSerializer(..., many=True).data.
+    """
+    # Поля, у которых to_representation не меняет значение, полученное из БД
+    PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+                          serializers.ChoiceField, serializers.PrimaryKeyRelatedField)
+
+    def __init__(self, serializer_class=HabitSerializer):
+        self.fields = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            column = f'{field.source}_id' if isinstance(field, serializers.RelatedField) else field.source
+            self.fields.append((name, column, field))
+
+    def get_values(self, queryset):
+        return queryset.values(*[column for _, column, _ in self.fields])
+
+    @staticmethod
+    def get_converter(field):
+        if isinstance(field, HabitValuesSerializer.PASSTHROUGH_FIELDS):
+            return None
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if output_format is None or output_format.lower() != ISO_8601:
+                return field.to_representation
+            # То же, что DateTimeField.to_representation, но часовой пояс определяется один раз
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+            def convert(value):
+                if field_timezone is None or value.tzinfo is None:
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert
+        return field.to_representation
+
+    def to_representation(self, rows):
+        fields = [(name, column, self.get_converter(field)) for name, column, field in self.fields]
+        return [
+            {name: row[column] if converter is None or row[column] is None else converter(row[column])
+             for name, column, converter in fields}
+            for row in rows
+        ]
@@ -0,0 +1,87 @@
+import logging
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from habits.cache import invalidate_public_feed, invalidate_user_habits
+from habits.models import Habit
+from habits.reminders import ReminderIndex, get_reminder_index
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_habit_list(sender, instance, **kwargs):
+    # Сбрасываем кэш списка привычек владельца
+    invalidate_user_habits(instance.user_id)
+
+
+def has_public_dependents(habits):
+    """
+    Ссылаются ли на привычки habits публичные привычки (их лента выводит связанную привычку).
+
+    Связанными бывают только приятные привычки, для остальных запрос не выполняется. Привычки, загруженные
+    без is_pleasant (отметка оповещения в send_notifications), не проверяются: они меняют только поля,
+    которых нет в развёрнутой связанной привычке.
+    """
+    habit_ids = [habit.pk for habit in habits
+                 if habit.__dict__.get('is_pleasant') and habit.pk is not None]
+    return bool(habit_ids) and Habit.objects.filter(linked_habit_id__in=habit_ids, is_public=True).exists()
+
+
+@receiver(pre_delete, sender=Habit)
+def remember_public_dependents(sender, instance, **kwargs):
+    # После удаления ссылки зависимых привычек уже обнулены (SET_NULL без сигналов), поэтому проверяем до него
+    instance._has_public_dependents = has_public_dependents([instance])
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_public_habits(sender, instance, signal, **kwargs):
+    # Ленту публичных привычек сбрасываем, только если привычка в неё входит или входила
+    # либо на неё ссылается публичная привычка
+    if instance.is_public or instance.was_public:
+        invalidate_public_feed()
+    elif signal is post_delete:
+        if getattr(instance, '_has_public_dependents', False):
+            invalidate_public_feed()
+    elif has_public_dependents([instance]):
+        invalidate_public_feed()
+
+
+@receiver(post_save, sender=Habit)
+def index_habit_reminder(sender, instance, **kwargs):
+    # Обновляем индекс оповещений после фиксации транзакции
+    if settings.REMINDER_INDEX_ENABLED:
+        transaction.on_commit(lambda: _update_index(get_reminder_index().add, [instance]))
+
+
+@receiver(post_delete, sender=Habit)
+def unindex_habit_reminder(sender, instance, **kwargs):
+    # Идентификатор берём сразу: после удаления Django обнуляет instance.pk, а внутри внешней транзакции
+    # обработчик on_commit выполняется позже
+    if settings.REMINDER_INDEX_ENABLED:
+        habit_id, member = instance.pk, ReminderIndex.get_member(instance)
+        transaction.on_commit(lambda: _update_index(get_reminder_index().remove, habit_id, member))
+
+
+def habits_bulk_saved(habits):
+    """Действия обработчиков post_save для привычек, записанных через bulk_create/bulk_update (без сигналов)."""
+    invalidate_user_habits(*{habit.user_id for habit in habits})
+    if any(habit.is_public or habit.was_public for habit in habits) or has_public_dependents(habits):
+        invalidate_public_feed()
+    if settings.REMINDER_INDEX_ENABLED:
+        transaction.on_commit(lambda: _update_index(get_reminder_index().add, habits))
+
+
+def _update_index(method, *args):
+    # Недоступность Redis не должна ломать сохранение привычки: индекс восстанавливается командой
+    # rebuild_reminder_index, а пропущенные оповещения подбирает поиск по БД
+    try:
+        method(*args)
+    except redis.RedisError:
+        logger.exception('Не удалось обновить индекс оповещений')
@@ -1,60 +1,123 @@
-import os
-import requests
+from datetime import datetime
+
 from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
 from habits.models import Habit
-from users.models import User
-from datetime import datetime, timedelta
+from habits.signals import habits_bulk_saved
+from habits.reminders import (claim_due_habits, get_due_from_index, incr_metric, mark_notified, mark_shard_processed,
+                              reminder_lock)
+from habits.telegram import RetryAfter, build_reminder_text, get_telegram_client
 
 
 @shared_task
 def send_habit_reminder():
-    # Получаем список всех пользователей
-    users = User.objects.all()
+    # Если предыдущий тик ещё раздаёт задачи, этот тик пропускается
+    with reminder_lock('tick') as acquired:
+        if not acquired:
+            incr_metric('ticks_skipped')
+            return
+        incr_metric('ticks')
+
+        # Кандидатов на оповещение берём из индекса в Redis; шарды, для которых индекс в этом тике
+        # недоступен (None), ищут наступившие оповещения в БД
+        shard_count = settings.REMINDER_SHARD_COUNT
+        now = timezone.now()
+        habit_ids_by_shard = dict.fromkeys(range(shard_count))
+        if settings.REMINDER_INDEX_ENABLED:
+            habit_ids_by_shard = get_due_from_index(now, shard_count)
+
+        # Раздаём обработку тика шардам, которые выполняются параллельно на всех воркерах
+        for shard, habit_ids in habit_ids_by_shard.items():
+            if habit_ids is None:
+                send_habit_reminder_shard.delay(shard, shard_count, now.isoformat())
+            elif habit_ids:
+                send_habit_reminder_shard.delay(shard, shard_count, now.isoformat(), habit_ids)
+
+
+@shared_task
+def send_habit_reminder_shard(shard, shard_count, now, habit_ids=None):
+    # Шард не обрабатывается параллельно сам с собой: если шард предыдущего тика ещё работает, выходим
+    with reminder_lock(f'shard:{shard}:{shard_count}') as acquired:
+        if not acquired:
+            incr_metric('shards_skipped')
+            return 0
+        incr_metric('shards')
+
+        # Захватываем привычки шарда, время оповещения которых наступило к моменту тика
+        now = datetime.fromisoformat(now)
+        habit_ids = claim_due_habits(shard, shard_count, now, habit_ids)
+        # Минута тика считается обработанной шардом только после захвата её привычек
+        if settings.REMINDER_INDEX_ENABLED:
+            mark_shard_processed(shard, shard_count, now)
+
+    # Отправляем оповещения пачками: одна задача на TELEGRAM_BATCH_SIZE привычек
+    batch_size = settings.TELEGRAM_BATCH_SIZE
+    period = timezone.localdate(now).isoformat()
+    for start in range(0, len(habit_ids), batch_size):
+        send_notifications.delay(habit_ids[start:start + batch_size], period)
+    return len(habit_ids)
+
+
+@shared_task
+def send_notifications(habit_ids, period=None):
+    """
+    Отправляет оповещения по пачке привычек через общий пул соединений с Telegram.
+
+    Возвращает результат по каждой привычке: {'sent': [id, ...], 'failed': {id: ошибка}, 'skipped': [id, ...],
+    'retried': [id, ...]}. Привычки без чата Telegram пропускаются. Повторной отправки при ошибке нет:
+    привычка уже захвачена тиком, и следующее оповещение будет отправлено в следующий период. Исключение -
+    ответ HTTP 429 с долгим ожиданием: такие привычки отправляются отдельной задачей через указанное время.
+
+    Если передан период (дата тика), привычки, уже оповещённые за этот период, отбрасываются.
+    """
+    if period is not None:
+        habit_ids = mark_notified(habit_ids, period)
 
-    # Проходимся по всем пользователям
-    for user in users:
-        # Получаем список всех привычек пользователя
-        habits = Habit.objects.filter(user=user)
+    # Загружаем всю пачку одним запросом вместе с пользователями и только нужные для оповещения поля
+    habits = Habit.objects.filter(pk__in=habit_ids).select_related('user').only(
+        'time', 'action', 'periodicity', 'execution_time', 'last_notification', 'is_public',
+        'user__tlg_chat_id')
 
-        # Проходимся по всем привычкам пользователя
-        for habit in habits:
-            # Получаем время на выполнение привычки
-            execution_time = habit.execution_time
+    messages = {}
+    skipped = []
+    by_id = {}
+    for habit in habits:
+        by_id[habit.pk] = habit
+        tlg_chat_id = habit.user.tlg_chat_id if habit.user else None
+        if tlg_chat_id:
+            messages[habit.pk] = (tlg_chat_id, build_reminder_text(habit))
+        else:
+            # Привычка без чата Telegram пропускается: время следующего оповещения уже назначено при захвате
+            skipped.append(habit.pk)
 
-            # Получаем дату и время последнего оповещения привычки
-            last_note = habit.last_notification
+    results = get_telegram_client().send_messages(messages)
 
-            # Получаем время текущего момента
-            now = datetime.now().replace(second=0, microsecond=0)
+    sent = [habit_id for habit_id, error in results.items() if error is None]
+    retried = {habit_id: error for habit_id, error in results.items() if isinstance(error, RetryAfter)}
+    failed = {str(habit_id): error for habit_id, error in results.items()
+              if error is not None and habit_id not in retried}
+    if retried:
+        # Период уже отмечен для этих привычек, поэтому повтор передаётся без него
+        send_notifications.apply_async((list(retried),), countdown=max(error.seconds for error in retried.values()))
 
-            # Получаем время начала выполнения привычки
-            start_time = habit.time.replace(second=0, microsecond=0)
+    # Записываем время оповещения и следующее время оповещения отправленных привычек одним запросом
+    now = timezone.now()
+    updated = []
+    for habit_id in sent:
+        habit = by_id[habit_id]
+        habit.last_notification = now
+        habit.next_due_at = habit.get_next_due_at(after=now)
+        updated.append(habit)
+    if updated:
+        Habit.objects.bulk_update(updated, ['last_notification', 'next_due_at'])
+        # bulk_update не отправляет сигналов: сбрасываем кэши и обновляем индекс оповещений сами
+        habits_bulk_saved(updated)
 
-            # Проверяем периодичность перед отправкой оповещения
-            if habit.periodicity == 'daily':
-                # Проверяем, было ли последнее оповещение выполнено сегодня или раньше и если время начала выполнения
-                # привычки равно текущему времени
-                if (last_note is None or last_note.date() < now.date()) and start_time == now:
-                    send_notification.delay(habit, execution_time)
-            elif habit.periodicity == 'weekly':
-                # Проверяем, было ли последнее оповещение выполнено на прошлой неделе или раньше и если время начала
-                # выполнения привычки равно текущему времени
-                if (last_note is None or last_note.date() < (now - timedelta(days=7)).date()) and start_time == now:
-                    send_notification.delay(habit, execution_time)
+    return {'sent': sent, 'failed': failed, 'skipped': skipped, 'retried': list(retried)}
 
 
 @shared_task
-def send_notification(habit, execution_time):
-    # Отправляем сообщение в телеграм бота
-    tlg_bot_token = os.getenv('TLG_BOT_TOKEN')
-    tlg_chat_id = habit.user.tlg_chat_id
-    url = f'https://api.telegram.org/bot{tlg_bot_token}/sendMessage'
-    msg = f"Напоминание:\n\n - необходимо выполнить привычку '{habit.action}' за: {execution_time} секунд."
-    requests.post(url, data={
-        'chat_id': tlg_chat_id,
-        'text': msg
-    })
-
-    # Обновляем поле last_notification текущей привычки
-    habit.last_notification = datetime.now()
-    habit.save()
+def send_notification(habit_id):
+    # Оповещение по одной привычке - частный случай пачки
+    return send_notifications([habit_id])
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+from habits.reminders import get_cache_redis_client
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket.
+
+    Корзина вмещает capacity токенов и пополняется со скоростью rate токенов в секунду.
+    Метод acquire блокирует поток до появления свободного токена.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def is_full(self):
+        """Заполнена ли корзина: такая корзина ничем не отличается от новой."""
+        with self.lock:
+            self._refill()
+            return self.tokens >= self.capacity
+
+
+class RedisTokenBucket:
+    """
+    Token bucket в Redis, общий для всех процессов и воркеров.
+
+    Состояние корзины (токены и время пополнения) хранится в хэше key и меняется скриптом Lua атомарно;
+    время берётся у Redis, поэтому расхождение часов воркеров не влияет на лимит. Ключ истекает,
+    когда корзина заполнилась бы, поэтому корзины неактивных чатов не накапливаются.
+    """
+    SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local capacity = tonumber(ARGV[2])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+        local tokens = tonumber(state[1]) or capacity
+        local updated_at = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = math.ceil((1 - tokens) / rate * 1000)
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+        return wait
+    """
+
+    def __init__(self, script, key, rate, capacity=None):
+        self.script = script
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+
+    def acquire(self):
+        while True:
+            # Скрипт забирает токен и возвращает 0 или сколько миллисекунд ждать следующего
+            wait = self.script(keys=[self.key], args=[self.rate, self.capacity])
+            if not wait:
+                return
+            time.sleep(wait / 1000)
+
+
+class RetryAfter:
+    """Результат отправки, которую Telegram (HTTP 429) попросил повторить через seconds секунд."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __str__(self):
+        return f'HTTP 429: retry after {self.seconds} s'
+
+
+class TelegramClient:
+    """
+    Клиент Telegram Bot API с пулом keep-alive соединений.
+
+    Сообщения отправляются параллельно (не более max_workers одновременно) с соблюдением
+    общего лимита и лимита на один чат. Если кэш хранится в Redis, лимиты считаются в нём
+    (RedisTokenBucket) и действуют на все процессы воркеров вместе. Иначе (тесты, локальная
+    разработка) лимиты считаются в процессе: корзины чатов хранятся в порядке последнего обращения,
+    заполнившиеся корзины давно не использованных чатов удаляются.
+    """
+    RATE_KEY_PREFIX = 'habits:telegram:rate'
+
+    def __init__(self, token=None, max_workers=None, timeout=None, redis_client=None):
+        self.token = token or settings.TLG_BOT_TOKEN
+        self.max_workers = max_workers or settings.TELEGRAM_MAX_WORKERS
+        self.timeout = timeout or settings.TELEGRAM_TIMEOUT
+        self.url = f'https://api.telegram.org/bot{self.token}/sendMessage'
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+
+        redis_client = redis_client or get_cache_redis_client()
+        self.rate_script = redis_client.register_script(RedisTokenBucket.SCRIPT) if redis_client else None
+        if self.rate_script is not None:
+            self.global_bucket = RedisTokenBucket(self.rate_script, f'{self.RATE_KEY_PREFIX}:global',
+                                                  settings.TELEGRAM_GLOBAL_RATE)
+        else:
+            self.global_bucket = TokenBucket(settings.TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets = OrderedDict()
+        self.chat_buckets_lock = threading.Lock()
+
+    def get_chat_bucket(self, chat_id):
+        if self.rate_script is not None:
+            return RedisTokenBucket(self.rate_script, f'{self.RATE_KEY_PREFIX}:chat:{chat_id}',
+                                    settings.TELEGRAM_CHAT_RATE, capacity=1)
+        with self.chat_buckets_lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self.chat_buckets[chat_id] = TokenBucket(settings.TELEGRAM_CHAT_RATE, capacity=1)
+            else:
+                self.chat_buckets.move_to_end(chat_id)
+            # В начале словаря - давно использованные чаты, удаляем их корзины, пока они заполнены
+            while len(self.chat_buckets) > 1:
+                oldest = next(iter(self.chat_buckets.values()))
+                if not oldest.is_full():
+                    break
+                self.chat_buckets.popitem(last=False)
+            return bucket
+
+    def send_message(self, chat_id, text):
+        """
+        Отправляет одно сообщение. Возвращает None при успехе, RetryAfter, если Telegram просит
+        повторить отправку позже, или текст ошибки.
+        """
+        self.get_chat_bucket(chat_id).acquire()
+        self.global_bucket.acquire()
+        try:
+            response = self.session.post(self.url, data={'chat_id': chat_id, 'text': text}, timeout=self.timeout)
+            # При превышении лимитов Telegram сообщает, через сколько секунд можно повторить запрос:
+            # короткую паузу выжидаем здесь, о длинной сообщаем вызывающему коду
+            if response.status_code == 429:
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                if retry_after > self.timeout:
+                    return RetryAfter(retry_after)
+                time.sleep(retry_after)
+                response = self.session.post(self.url, data={'chat_id': chat_id, 'text': text}, timeout=self.timeout)
+                if response.status_code == 429:
+                    return RetryAfter(response.json().get('parameters', {}).get('retry_after', 1))
+        except (requests.RequestException, ValueError) as exc:
+            return str(exc)
+        if response.status_code != 200:
+            return f'HTTP {response.status_code}: {response.text[:200]}'
+        return None
+
+    def send_messages(self, messages):
+        """
+        Отправляет пачку сообщений вида {ключ: (chat_id, text)}.
+
+        Возвращает словарь {ключ: None, RetryAfter или текст ошибки}.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(self.send_message, chat_id, text)
+                       for key, (chat_id, text) in messages.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_telegram_client():
+    """Клиент Telegram, общий для всех задач процесса воркера: соединения и лимиты переиспользуются."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient()
+        return _client
+
+
+def build_reminder_text(habit):
+    return f"Напоминание:\n\n - необходимо выполнить привычку '{habit.action}' за: {habit.execution_time} секунд."
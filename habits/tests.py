@@ -1,15 +1,48 @@
+import csv
 import datetime
+import decimal
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-from django.test import TestCase
+import requests
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import AsyncClient, LiveServerTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
 from habits.models import Habit
+from habits.paginators import HabitCursorPagination
+from habits.tasks import send_habit_reminder, send_habit_reminder_shard, send_notification, send_notifications
+from habits.cache import get_cache_stats
+from habits.export import export_habits
+from habits.serializers import HabitSerializer, HabitValuesSerializer
+from habits.seeding import seed_load
+from habits.reminders import (ReminderIndex, claim_due_habits, get_due_from_index, get_reminder_metrics,
+                              reminder_lock)
+from habits.telegram import TelegramClient
+from src.parsers import FastJSONParser
+from src.renderers import FastJSONRenderer
 
 
 class HabitTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create(email='user_test@sky.pro', is_superuser=False)
         self.user.set_password('user_test')
@@ -64,6 +97,16 @@ class HabitTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['place'], habit.place)
 
+    def test_scheduler_field_not_exposed(self):
+        habit = Habit.objects.create(user=self.user, place='Home', action='Exercise')
+        url = reverse('habits:retrieve', args=[habit.id])
+        response = self.client.get(url)
+        self.assertNotIn('next_due_at', response.data)
+        # Оповещение переносит next_due_at, но не меняет привычку для клиента
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=timezone.now() + datetime.timedelta(days=7))
+        self.assertEqual(self.client.get(url)['ETag'], response['ETag'])
+        self.assertNotIn('next_due_at', self.client.get(reverse('habits:list')).data['results'][0])
+
     def test_own_habit_update(self):
         habit = Habit.objects.create(user=self.user, place='Home', time='12:00', action='Exercise')
         url = reverse('habits:update', args=[habit.id])
@@ -93,3 +136,927 @@ class HabitTestCase(TestCase):
         current_time = datetime.datetime.now().strftime('%H:%M')
         self.assertEqual(habit.time.strftime('%H:%M'), current_time)
         self.assertEqual(habit.action, 'Exercise')
+
+    def test_partial_update_validates_whole_habit(self):
+        pleasant = Habit.objects.create(user=self.user, action='Coffee', is_pleasant=True)
+        linked = Habit.objects.create(user=self.user, action='Exercise', linked_habit=pleasant)
+        rewarded = Habit.objects.create(user=self.user, action='Run', reward='Cake')
+        for habit, data in ((linked, {'reward': 'Cake'}), (rewarded, {'is_pleasant': True})):
+            response = self.client.patch(reverse('habits:update', args=[habit.id]), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('non_field_errors', response.data)
+        # Снятие вознаграждения вместе с признаком приятной привычки допустимо
+        response = self.client.patch(reverse('habits:update', args=[rewarded.id]),
+                                     {'is_pleasant': True, 'reward': ''}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class HabitReminderScheduleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user_test@sky.pro', tlg_chat_id='1')
+
+    def test_next_due_at_on_create(self):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+        self.assertIsNotNone(habit.next_due_at)
+        self.assertGreater(habit.next_due_at, timezone.now())
+        self.assertLessEqual(habit.next_due_at, timezone.now() + datetime.timedelta(days=1))
+
+    def test_next_due_at_on_time_update(self):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+        habit.time = '08:30'
+        habit.save()
+        due = timezone.localtime(habit.next_due_at)
+        self.assertEqual((due.hour, due.minute), (8, 30))
+        self.assertGreater(habit.next_due_at, timezone.now())
+
+    def test_next_due_at_respects_period(self):
+        habit = Habit.objects.create(user=self.user, action='Exercise', periodicity='weekly')
+        habit.last_notification = timezone.now()
+        habit.save()
+        self.assertGreaterEqual(
+            timezone.localdate(habit.next_due_at),
+            timezone.localdate() + datetime.timedelta(days=7))
+
+    def test_unrelated_edit_keeps_schedule(self):
+        habit = Habit.objects.create(user=self.user, action='Exercise', periodicity='weekly')
+        # Захват тиком сдвинул оповещение на неделю, а отправка не состоялась
+        claimed = timezone.now() + datetime.timedelta(days=7)
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=claimed)
+        habit = Habit.objects.get(pk=habit.pk)
+        habit.place = 'Gym'
+        habit.save(update_fields=['place'])
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_due_at, claimed)
+
+        # Приостановленная привычка правкой не возобновляется, даже при смене времени
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=None)
+        habit = Habit.objects.get(pk=habit.pk)
+        habit.time = '08:30'
+        habit.save()
+        habit.refresh_from_db()
+        self.assertIsNone(habit.next_due_at)
+
+    @mock.patch('habits.tasks.send_habit_reminder_shard.delay')
+    def test_reminder_fans_out_to_shards(self, delay):
+        with self.settings(REMINDER_SHARD_COUNT=3):
+            send_habit_reminder()
+
+        self.assertEqual([call.args[:2] for call in delay.call_args_list], [(0, 3), (1, 3), (2, 3)])
+
+    @mock.patch('habits.tasks.get_due_from_index', return_value={0: [5, 7], 1: []})
+    @mock.patch('habits.tasks.send_habit_reminder_shard.delay')
+    def test_reminder_uses_index_candidates(self, delay, get_due_from_index):
+        with self.settings(REMINDER_SHARD_COUNT=2, REMINDER_INDEX_ENABLED=True):
+            send_habit_reminder()
+
+        delay.assert_called_once_with(0, 2, mock.ANY, [5, 7])
+
+    def test_index_cursor_per_shard(self):
+        now = timezone.make_aware(datetime.datetime(2024, 1, 1, 8, 31, 20))
+        minute = now.replace(second=0)
+        index = mock.Mock(spec=ReminderIndex)
+        # Шард 0 отстал на две минуты, у шарда 1 нет отметки, шард 2 уже обработал минуту, шард 3 отстал на одну
+        index.get_cursors.return_value = [minute - datetime.timedelta(minutes=2), None, minute,
+                                          minute - datetime.timedelta(minutes=1)]
+        index.get_due.return_value = [(4, 5), (8, 6), (2, 7)]
+        with mock.patch('habits.reminders.get_reminder_index', return_value=index):
+            self.assertEqual(get_due_from_index(now, 4), {0: [5, 6], 1: None, 2: [], 3: []})
+
+        index.get_due.assert_called_once_with(minute - datetime.timedelta(minutes=2), minute)
+        # Сразу сдвигается только отметка шарда без кандидатов, шард 0 сдвинет её сам после захвата
+        index.set_cursors.assert_called_once_with([3], 4, minute)
+
+    @mock.patch('habits.signals.get_reminder_index')
+    def test_bulk_delete_in_transaction_unindexes_habits(self, get_reminder_index):
+        habits = [Habit.objects.create(user=self.user, action=f'Habit {i}') for i in range(3)]
+        with self.settings(REMINDER_INDEX_ENABLED=True), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Habit.objects.filter(pk__in=[habit.pk for habit in habits]).delete()
+
+        removed = [call.args for call in get_reminder_index.return_value.remove.call_args_list]
+        self.assertEqual(sorted(removed), [(habit.pk, f'{self.user.pk}:{habit.pk}') for habit in habits])
+
+    @mock.patch('habits.tasks.mark_shard_processed')
+    @mock.patch('habits.tasks.send_notifications.delay')
+    def test_skipped_shard_keeps_cursor(self, delay, mark_shard_processed):
+        now = timezone.now()
+        with self.settings(REMINDER_INDEX_ENABLED=True):
+            with reminder_lock('shard:0:1'):
+                send_habit_reminder_shard(0, 1, now.isoformat(), [])
+            mark_shard_processed.assert_not_called()
+
+            send_habit_reminder_shard(0, 1, now.isoformat(), [])
+        mark_shard_processed.assert_called_once_with(0, 1, now)
+
+    def test_index_bucket_is_utc_minute(self):
+        # 08:30 по Москве - это 05:30 UTC
+        due_at = timezone.make_aware(datetime.datetime(2024, 1, 1, 8, 30))
+        self.assertEqual(ReminderIndex.get_bucket('daily', due_at), 'habits:reminder:index:daily:330')
+        self.assertEqual(ReminderIndex.get_bucket('weekly', due_at), 'habits:reminder:index:weekly:0:330')
+
+    @mock.patch('habits.tasks.send_notifications.delay')
+    def test_reminder_sends_only_due_habits(self, delay):
+        due = Habit.objects.create(user=self.user, action='Exercise')
+        Habit.objects.create(user=self.user, action='Workout')
+        Habit.objects.filter(pk=due.pk).update(next_due_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        send_habit_reminder_shard(0, 1, timezone.now().isoformat())
+
+        delay.assert_called_once_with([due.pk], mock.ANY)
+
+    @mock.patch('habits.tasks.send_notifications.delay')
+    def test_habit_claimed_once_per_period(self, delay):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=timezone.now() - datetime.timedelta(minutes=1))
+        now = timezone.now().isoformat()
+
+        # Повторный (или запоздавший) запуск того же тика не отправляет оповещение ещё раз
+        send_habit_reminder_shard(0, 1, now)
+        send_habit_reminder_shard(0, 1, now)
+
+        delay.assert_called_once_with([habit.pk], mock.ANY)
+        habit.refresh_from_db()
+        self.assertGreater(habit.next_due_at, timezone.now())
+
+    @mock.patch('habits.tasks.send_notifications.delay')
+    def test_contended_shard_is_skipped(self, delay):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        with reminder_lock('shard:0:1') as acquired:
+            self.assertTrue(acquired)
+            self.assertEqual(send_habit_reminder_shard(0, 1, timezone.now().isoformat()), 0)
+
+        delay.assert_not_called()
+        self.assertEqual(get_reminder_metrics()['shards_skipped'], 1)
+
+    @mock.patch('habits.tasks.send_habit_reminder_shard.delay')
+    def test_overlapping_tick_is_skipped(self, delay):
+        with reminder_lock('tick'):
+            send_habit_reminder()
+
+        delay.assert_not_called()
+        self.assertEqual(get_reminder_metrics()['ticks_skipped'], 1)
+
+    @mock.patch('habits.tasks.send_notifications.delay')
+    def test_shards_partition_due_habits(self, delay):
+        users = [User.objects.create(email=f'user_{i}@sky.pro') for i in range(4)]
+        habit_ids = [Habit.objects.create(user=user, action='Exercise').pk for user in users for _ in range(2)]
+        Habit.objects.update(next_due_at=timezone.now() - datetime.timedelta(minutes=1))
+        now = timezone.now().isoformat()
+
+        claimed = [send_habit_reminder_shard(shard, 2, now) for shard in range(2)]
+
+        self.assertEqual(claimed, [4, 4])
+        sent = [habit_id for call in delay.call_args_list for habit_id in call.args[0]]
+        self.assertEqual(sorted(sent), sorted(habit_ids))
+
+    @mock.patch('requests.Session.post', return_value=mock.Mock(status_code=200))
+    def test_notification_reschedules_habit(self, post):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+        send_notification(habit.pk)
+
+        habit.refresh_from_db()
+        self.assertEqual(post.call_count, 1)
+        self.assertIsNotNone(habit.last_notification)
+        self.assertGreater(habit.next_due_at, timezone.now())
+
+
+class HabitNotificationDispatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user_test@sky.pro', tlg_chat_id='1')
+        self.client_patcher = mock.patch('habits.tasks.get_telegram_client', return_value=TelegramClient(token='test'))
+        self.client_patcher.start()
+        self.addCleanup(self.client_patcher.stop)
+
+    @mock.patch('requests.Session.post')
+    def test_batch_results(self, post):
+        post.side_effect = [mock.Mock(status_code=200), mock.Mock(status_code=400, text='Bad Request')]
+        first = Habit.objects.create(user=self.user, action='Exercise')
+        second = Habit.objects.create(user=self.user, action='Workout')
+        no_chat = Habit.objects.create(user=User.objects.create(email='no_chat@sky.pro'), action='Read')
+
+        result = send_notifications([first.pk, second.pk, no_chat.pk])
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(len(result['sent']), 1)
+        self.assertEqual(len(result['failed']), 1)
+        self.assertEqual(result['skipped'], [no_chat.pk])
+        sent = Habit.objects.get(pk=result['sent'][0])
+        self.assertIsNotNone(sent.last_notification)
+
+    def test_skipped_habit_keeps_claimed_schedule(self):
+        user = User.objects.create(email='no_chat@sky.pro')
+        habit = Habit.objects.create(user=user, action='Read', periodicity='weekly',
+                                     last_notification=timezone.now() - datetime.timedelta(days=8))
+        Habit.objects.filter(pk=habit.pk).update(next_due_at=timezone.now() - datetime.timedelta(minutes=1))
+        claim_due_habits(0, 1, timezone.now())
+        habit.refresh_from_db()
+        claimed = habit.next_due_at
+        self.assertGreater(claimed, timezone.now() + datetime.timedelta(days=6))
+
+        result = send_notifications([habit.pk])
+        self.assertEqual(result['skipped'], [habit.pk])
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_due_at, claimed)
+
+    @mock.patch('habits.tasks.send_notifications.apply_async')
+    @mock.patch('requests.Session.post')
+    def test_long_retry_after_is_requeued(self, post, apply_async):
+        post.return_value = mock.Mock(status_code=429, json=lambda: {'parameters': {'retry_after': 30}})
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+
+        result = send_notifications([habit.pk], period='2024-01-01')
+
+        self.assertEqual((result['retried'], result['failed']), ([habit.pk], {}))
+        apply_async.assert_called_once_with(([habit.pk],), countdown=30)
+
+    @mock.patch('habits.telegram.time.sleep')
+    def test_redis_rate_limit_shared_by_key(self, sleep):
+        redis_client = mock.Mock()
+        script = redis_client.register_script.return_value
+        # Первый вызов скрипта просит подождать 250 мс, второй выдаёт токен
+        script.side_effect = [250, 0]
+        client = TelegramClient(token='test', redis_client=redis_client)
+        bucket = client.get_chat_bucket('42')
+        bucket.acquire()
+
+        self.assertEqual(script.call_args.kwargs['keys'], ['habits:telegram:rate:chat:42'])
+        sleep.assert_called_once_with(0.25)
+        self.assertEqual(client.chat_buckets, {})
+
+    @mock.patch('habits.telegram.time.monotonic')
+    def test_idle_chat_buckets_evicted(self, monotonic):
+        monotonic.return_value = 100.0
+        client = TelegramClient(token='test')
+        for chat_id in ('1', '2', '3'):
+            client.get_chat_bucket(chat_id).acquire()
+        self.assertEqual(list(client.chat_buckets), ['1', '2', '3'])
+
+        # Через секунду корзины заполнились и удаляются при обращении к другому чату
+        monotonic.return_value = 101.0
+        client.get_chat_bucket('4')
+        self.assertEqual(list(client.chat_buckets), ['4'])
+
+    @mock.patch('requests.Session.post')
+    def test_network_error_is_reported(self, post):
+        post.side_effect = requests.ConnectionError('connection refused')
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+
+        result = send_notifications([habit.pk])
+
+        self.assertEqual(result['sent'], [])
+        self.assertEqual(result['failed'], {str(habit.pk): 'connection refused'})
+        habit.refresh_from_db()
+        self.assertIsNone(habit.last_notification)
+
+    @mock.patch('requests.Session.post', return_value=mock.Mock(status_code=200))
+    def test_batch_query_count(self, post):
+        users = [User.objects.create(email=f'user_{i}@sky.pro', tlg_chat_id=str(i + 10)) for i in range(5)]
+        habit_ids = [Habit.objects.create(user=user, action='Exercise').pk for user in users]
+
+        # Один запрос на чтение пачки и один на запись
+        with self.assertNumQueries(2):
+            result = send_notifications(habit_ids)
+
+        self.assertEqual(sorted(result['sent']), habit_ids)
+        self.assertEqual(Habit.objects.filter(last_notification__isnull=False).count(), 5)
+
+    @mock.patch('requests.Session.post', return_value=mock.Mock(status_code=200))
+    def test_redelivered_batch_is_not_sent_twice(self, post):
+        habit = Habit.objects.create(user=self.user, action='Exercise')
+
+        send_notifications([habit.pk], '2024-01-01')
+        result = send_notifications([habit.pk], '2024-01-01')
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(result['sent'], [])
+        self.assertEqual(get_reminder_metrics()['duplicates'], 1)
+
+
+class HabitListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        Habit.objects.create(user=self.user, place='Home', action='Exercise')
+
+    def test_second_request_served_from_cache(self):
+        url = reverse('habits:list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(get_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_cache_invalidated_on_change(self):
+        url = reverse('habits:list')
+        self.client.get(url)
+        Habit.objects.create(user=self.user, place='Gym', action='Workout')
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cache_is_per_user(self):
+        url = reverse('habits:list')
+        self.client.get(url)
+        other = User.objects.create(email='other@sky.pro')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'], [])
+
+    def test_stats_for_admin_only(self):
+        url = reverse('habits:cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=User.objects.create(email='admin@sky.pro', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+class PublicHabitFeedTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.habit = Habit.objects.create(user=self.user, place='Home', action='Exercise', is_public=True)
+        self.url = reverse('habits:public')
+
+    def test_anonymous_access_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_private_change_keeps_feed(self):
+        etag = self.client.get(self.url)['ETag']
+        Habit.objects.create(user=self.user, action='Read')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_linked_habit_change_changes_feed(self):
+        linked = Habit.objects.create(user=self.user, action='Tea', is_pleasant=True)
+        Habit.objects.create(user=self.user, action='Run', linked_habit=linked, is_public=True)
+        params = {'expand': 'linked_habit'}
+
+        etag = self.client.get(self.url, params)['ETag']
+        linked.place = 'Kitchen'
+        linked.save()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Удаление обнуляет ссылку публичной привычки запросом без сигналов
+        etag = response['ETag']
+        linked.delete()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(result['linked_habit'] is None for result in response.data['results']))
+
+    def test_unpublish_changes_feed(self):
+        etag = self.client.get(self.url)['ETag']
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.is_public = False
+        habit.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class HabitCursorPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        self.habit_ids = [Habit.objects.create(user=self.user, action=f'Habit {i}', is_public=True).pk
+                          for i in range(7)]
+
+    def test_pages_follow_cursor(self):
+        response = self.client.get(reverse('habits:list'))
+        self.assertNotIn('count', response.data)
+        self.assertEqual([habit['id'] for habit in response.data['results']], self.habit_ids[:5])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([habit['id'] for habit in response.data['results']], self.habit_ids[5:])
+        self.assertIsNone(response.data['next'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse('habits:public'), {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 7)
+        response = self.client.get(reverse('habits:public'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(HabitCursorPagination.max_page_size, 100)
+
+    def test_no_count_query(self):
+        url = reverse('habits:public')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+
+class HabitBulkTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('habits:bulk')
+
+    def test_bulk_create(self):
+        data = [{'place': 'Home', 'action': f'Habit {i}', 'execution_time': 60} for i in range(30)]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(Habit.objects.filter(user=self.user, next_due_at__isnull=False).count(), 30)
+
+    def test_bulk_create_reports_item_errors(self):
+        pleasant = Habit.objects.create(user=self.user, action='Coffee', is_pleasant=True)
+        data = [
+            {'action': 'Valid'},
+            {'action': 'Too long', 'execution_time': 121},
+            {'action': 'Both', 'linked_habit': pleasant.pk, 'reward': 'Cake'},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('non_field_errors', response.data[1])
+        self.assertIn('non_field_errors', response.data[2])
+        self.assertEqual(Habit.objects.count(), 1)
+
+    def test_bulk_update(self):
+        habits = [Habit.objects.create(user=self.user, action=f'Habit {i}') for i in range(3)]
+        data = [{'id': habit.pk, 'place': 'Gym', 'time': '07:15'} for habit in habits]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for habit in habits:
+            habit.refresh_from_db()
+            self.assertEqual(habit.place, 'Gym')
+            self.assertEqual(habit.time.strftime('%H:%M'), '07:15')
+            self.assertEqual(timezone.localtime(habit.next_due_at).strftime('%H:%M'), '07:15')
+
+    def test_bulk_update_validates_whole_habit(self):
+        pleasant = Habit.objects.create(user=self.user, action='Coffee', is_pleasant=True)
+        linked = Habit.objects.create(user=self.user, action='Exercise', linked_habit=pleasant)
+        rewarded = Habit.objects.create(user=self.user, action='Run', reward='Cake')
+        data = [{'id': linked.pk, 'reward': 'Cake'}, {'id': rewarded.pk, 'is_pleasant': True}]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data[0])
+        self.assertIn('non_field_errors', response.data[1])
+        rewarded.refresh_from_db()
+        self.assertFalse(rewarded.is_pleasant)
+
+    def test_bulk_update_foreign_habit(self):
+        own = Habit.objects.create(user=self.user, action='Own')
+        foreign = Habit.objects.create(user=User.objects.create(email='other@sky.pro'), action='Foreign')
+        data = [{'id': own.pk, 'place': 'Gym'}, {'id': foreign.pk, 'place': 'Gym'}]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        own.refresh_from_db()
+        self.assertIsNone(own.place)
+
+    def test_bulk_delete(self):
+        own = [Habit.objects.create(user=self.user, action=f'Habit {i}').pk for i in range(3)]
+        foreign = Habit.objects.create(user=User.objects.create(email='other@sky.pro'), action='Foreign')
+        response = self.client.delete(self.url, own + [foreign.pk], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 3)
+        self.assertTrue(Habit.objects.filter(pk=foreign.pk).exists())
+
+
+class HabitConditionalUpdateTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Home', action='Exercise')
+        self.url = reverse('habits:update', args=[self.habit.id])
+
+    def test_patch_query_count(self):
+        # Одна выборка с условием на владельца и один UPDATE изменённых полей
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'place': 'Gym'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 2)
+        update = queries.captured_queries[1]['sql']
+        self.assertIn('"place"', update)
+        self.assertNotIn('"action"', update)
+
+    def test_unchanged_patch_does_not_write(self):
+        with self.assertNumQueries(1):
+            self.client.patch(self.url, {'place': 'Home'}, format='json')
+
+    def test_if_match(self):
+        etag = self.client.get(reverse('habits:retrieve', args=[self.habit.id]))['ETag']
+        response = self.client.patch(self.url, {'place': 'Gym'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Второй клиент с устаревшим ETag не перезаписывает изменения первого
+        response = self.client.patch(self.url, {'place': 'Park'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.place, 'Gym')
+
+    def test_foreign_habit_not_found(self):
+        other = User.objects.create(email='other@sky.pro')
+        habit = Habit.objects.create(user=other, action='Foreign')
+        response = self.client.patch(reverse('habits:update', args=[habit.id]), {'place': 'Gym'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HabitOwnershipTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        self.own = Habit.objects.create(user=self.user, action='Own')
+        self.foreign = Habit.objects.create(user=User.objects.create(email='other@sky.pro'), action='Foreign')
+
+    def test_retrieve_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('habits:retrieve', args=[self.own.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_foreign_habit_is_not_found(self):
+        for name, method in (('habits:retrieve', 'get'), ('habits:update', 'patch'), ('habits:delete', 'delete')):
+            with self.assertNumQueries(1):
+                response = getattr(self.client, method)(reverse(name, args=[self.foreign.id]))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Habit.objects.filter(pk=self.foreign.pk).exists())
+
+
+class HabitExpandTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(user=self.user, action='Coffee', is_pleasant=True, is_public=True)
+
+    def create_habits(self, count):
+        for i in range(count):
+            Habit.objects.create(user=self.user, action=f'Habit {i}', linked_habit=self.pleasant, is_public=True)
+
+    def test_expanded_representation(self):
+        self.create_habits(1)
+        response = self.client.get(reverse('habits:list'), {'expand': 'linked_habit,user'})
+        habit = response.data['results'][1]
+        self.assertEqual(habit['linked_habit']['id'], self.pleasant.pk)
+        self.assertEqual(habit['user'], {'id': self.user.pk, 'email': self.user.email})
+        self.assertIsNone(response.data['results'][0]['linked_habit'])
+
+    def test_constant_queries(self):
+        url = reverse('habits:list')
+        params = {'expand': 'linked_habit,user', 'page_size': 50}
+        self.create_habits(2)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url, params)
+        self.create_habits(20)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.data['results']), 23)
+        self.assertEqual(len(small_page), 1)
+        self.assertEqual(len(large_page), len(small_page))
+
+    def test_public_feed_hides_users(self):
+        self.create_habits(1)
+        response = self.client.get(reverse('habits:public'), {'expand': 'linked_habit,user'})
+        habit = response.data['results'][1]
+        self.assertEqual(habit['linked_habit']['id'], self.pleasant.pk)
+        self.assertEqual(habit['user'], self.user.pk)
+
+    def test_public_feed_keeps_private_linked_habit_id(self):
+        private = Habit.objects.create(user=self.user, action='Tea', place='Kitchen', is_pleasant=True)
+        habit = Habit.objects.create(user=self.user, action='Run', linked_habit=private, is_public=True)
+        response = APIClient().get(reverse('habits:public'), {'expand': 'linked_habit'})
+        result = next(result for result in response.data['results'] if result['id'] == habit.pk)
+        self.assertEqual(result['linked_habit'], private.pk)
+
+        # Владелец видит свою приватную привычку развёрнутой в своём списке
+        response = self.client.get(reverse('habits:list'), {'expand': 'linked_habit'})
+        result = next(result for result in response.data['results'] if result['id'] == habit.pk)
+        self.assertEqual(result['linked_habit']['place'], 'Kitchen')
+
+    def test_foreign_private_linked_habit(self):
+        other = User.objects.create(email='other@sky.pro')
+        foreign = Habit.objects.create(user=other, action='Tea', place='Kitchen', is_pleasant=True)
+        response = self.client.post(reverse('habits:create'), {'action': 'Run', 'linked_habit': foreign.pk},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('linked_habit', response.data)
+
+        # Связь, записанная в обход API, не раскрывает чужую приватную привычку
+        habit = Habit.objects.create(user=self.user, action='Run', linked_habit=foreign)
+        response = self.client.get(reverse('habits:list'), {'expand': 'linked_habit'})
+        result = next(result for result in response.data['results'] if result['id'] == habit.pk)
+        self.assertEqual(result['linked_habit'], foreign.pk)
+
+
+class HabitValuesSerializerTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create(email='user_test@sky.pro')
+        pleasant = Habit.objects.create(user=user, action='Coffee', is_pleasant=True, is_public=True)
+        habit = Habit.objects.create(user=user, place='Home', action='Exercise', linked_habit=pleasant,
+                                     execution_time=60, periodicity='weekly', is_public=True)
+        habit.time = datetime.time(7, 15, 30, 123456)
+        habit.last_notification = timezone.now()
+        habit.save()
+        Habit.objects.create(action='No user')
+
+    def test_same_output_as_model_serializer(self):
+        queryset = Habit.objects.order_by('id')
+        expected = JSONRenderer().render(HabitSerializer(queryset, many=True).data)
+        values_serializer = HabitValuesSerializer()
+        actual = JSONRenderer().render(values_serializer.to_representation(values_serializer.get_values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_list_endpoint_output(self):
+        response = APIClient().get(reverse('habits:public'))
+        expected = HabitSerializer(Habit.objects.filter(is_public=True).order_by('id'), many=True).data
+        self.assertEqual(response.content, JSONRenderer().render({'next': None, 'previous': None, 'results': expected}))
+
+
+class FastJSONTestCase(TestCase):
+    def test_same_output_as_json_renderer(self):
+        data = {
+            'datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'naive_datetime': datetime.datetime(2024, 1, 2, 3, 4, 5),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(7, 15, 30, 123456),
+            'decimal': decimal.Decimal('10.50'),
+            'lazy': gettext_lazy('Привычка'),
+            'text': 'Привычка \u2028 \u2029 "кавычки"',
+            1: [None, True, 1.5, (1, 2)],
+            'big': 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_indent_uses_json_renderer(self):
+        data = {'a': [1, 2]}
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"action": "Чай"}'.encode())), {'action': 'Чай'})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"action": NaN}'))
+
+    def test_api_uses_fast_renderer(self):
+        user = User.objects.create(email='user_test@sky.pro')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(reverse('habits:create'), {'action': 'Exercise', 'place': 'Home'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class HabitExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user_test@sky.pro')
+        other = User.objects.create(email='other@sky.pro')
+        Habit.objects.create(user=self.user, action='Exercise', place='Home')
+        habit = Habit.objects.create(user=self.user, action='Read, "book"', is_public=True)
+        habit.last_notification = timezone.now()
+        habit.save()
+        Habit.objects.create(user=other, action='Coffee', is_pleasant=True, is_public=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_export(self, **params):
+        response = self.client.get(reverse('habits:export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_own_ndjson(self):
+        response, content = self.get_export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        expected = HabitSerializer(Habit.objects.filter(user=self.user).order_by('id'), many=True).data
+        self.assertEqual([json.loads(line) for line in content.splitlines()],
+                         json.loads(JSONRenderer().render(expected)))
+
+    def test_export_public_csv(self):
+        response, content = self.get_export(export_format='csv', scope='public')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['action'] for row in rows], ['Read, "book"', 'Coffee'])
+        self.assertEqual(rows[1]['linked_habit'], '')
+        self.assertNotEqual(rows[0]['last_notification'], '')
+
+    def test_export_in_chunks(self):
+        chunks = list(export_habits(Habit.objects.all(), 'ndjson', chunk_size=2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(list(export_habits(Habit.objects.none(), 'csv')), [b'%s\r\n' % ','.join(
+            name for name, _, _ in HabitValuesSerializer().fields).encode()])
+
+    def test_export_invalid_params(self):
+        response = self.client.get(reverse('habits:export'), {'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = APIClient().get(reverse('habits:export'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class HabitImportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def post_file(self, name, content, **data):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post(reverse('habits:import'), {'file': upload, **data}, format='multipart')
+
+    def test_import_rejects_non_utf8(self):
+        upload = SimpleUploadedFile('habits.csv', 'action,place\nЗарядка,Дом\n'.encode('cp1251'))
+        response = self.client.post(reverse('habits:import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('UTF-8', response.data['file'])
+        self.assertFalse(Habit.objects.filter(user=self.user).exists())
+
+    def test_import_ndjson(self):
+        rows = [
+            {'id': 10, 'action': 'Exercise', 'place': 'Home', 'time': '07:30:00', 'linked_habit': 11},
+            {'id': 11, 'action': 'Coffee', 'is_pleasant': True, 'user': 999},
+            {'id': 12, 'action': 'Run', 'execution_time': 300},
+            {'id': 13, 'action': 'Read', 'linked_habit': 12},
+            {'id': 14, 'action': 'Walk', 'linked_habit': 99},
+            {'id': 11, 'action': 'Duplicate'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        response = self.post_file('habits.ndjson', content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['rejected'], 5)
+        self.assertEqual(sorted(error['line'] for error in response.data['errors']), [3, 4, 5, 6, 7])
+
+        habit = Habit.objects.get(action='Exercise')
+        self.assertEqual(habit.user, self.user)
+        self.assertEqual(habit.linked_habit, Habit.objects.get(action='Coffee', user=self.user))
+        self.assertEqual(habit.time, datetime.time(7, 30))
+        self.assertEqual(habit.next_due_at, habit.get_next_due_at())
+
+    def test_import_exported_csv(self):
+        other = User.objects.create(email='other@sky.pro')
+        pleasant = Habit.objects.create(user=other, action='Coffee', is_pleasant=True)
+        Habit.objects.create(user=other, action='Exercise', linked_habit=pleasant, periodicity='weekly')
+        content = b''.join(export_habits(Habit.objects.filter(user=other), 'csv')).decode()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_file('habits.csv', content)
+        self.assertEqual(response.data['created'], 2)
+        self.assertLess(len(queries), 10)
+        habit = Habit.objects.get(user=self.user, action='Exercise')
+        self.assertEqual(habit.periodicity, 'weekly')
+        self.assertEqual(habit.linked_habit.action, 'Coffee')
+        self.assertEqual(habit.linked_habit.user, self.user)
+
+    def test_import_invalid_file(self):
+        response = self.post_file('habits.csv', 'action,execution_time\nRun,500\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+        response = self.post_file('habits.txt', '', import_format='xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command_in_chunks(self):
+        rows = [{'id': i, 'action': f'Habit {i}', 'linked_habit': i + 1} for i in range(0, 10, 2)]
+        rows += [{'id': i, 'action': f'Pleasant {i}', 'is_pleasant': True} for i in range(1, 10, 2)]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write('\n'.join(json.dumps(row) for row in rows))
+        self.addCleanup(os.remove, file.name)
+        call_command('import_habits', file.name, user=self.user.email, chunk_size=3, stdout=io.StringIO())
+        self.assertEqual(Habit.objects.filter(user=self.user, linked_habit__is_pleasant=True).count(), 5)
+
+
+class LoadBenchmarkTestCase(TestCase):
+    def test_seed_load(self):
+        result = seed_load(50, habits_per_user=6, pleasant_ratio=0.3, linked_ratio=1)
+        habits = Habit.objects.filter(user__email__startswith='load_')
+        self.assertEqual(result, {'users': 50, 'habits': habits.count()})
+        self.assertTrue(habits.filter(is_pleasant=True).exists())
+        self.assertTrue(habits.filter(linked_habit__isnull=False).exists())
+        self.assertFalse(habits.filter(linked_habit__isnull=False).exclude(linked_habit__user_id=F('user_id')).exists())
+        self.assertFalse(habits.filter(is_pleasant=True, linked_habit__isnull=False).exists())
+        self.assertFalse(habits.filter(next_due_at__isnull=True).exists())
+
+    def test_bench_api_covers_routes_and_rolls_back(self):
+        seed_load(10)
+        habits = Habit.objects.count()
+        users = User.objects.count()
+        out, err = io.StringIO(), io.StringIO()
+        cache.clear()
+        with self.settings(REMINDER_INDEX_ENABLED=True), \
+                mock.patch('habits.reminders.get_reminder_index') as get_reminder_index:
+            call_command('bench_api', repeat=2, warmup=0, host='testserver', json=True, stdout=out, stderr=err)
+
+        # Тик не трогает индекс оповещений и не оставляет в кэше блокировок, ключей идемпотентности и счётчиков
+        get_reminder_index.assert_not_called()
+        self.assertEqual(set(get_reminder_metrics().values()), {0})
+        self.assertEqual(err.getvalue(), '')
+        results = json.loads(out.getvalue())['results']
+        self.assertIn('tick send_habit_reminder_shard', results)
+        for name, result in results.items():
+            self.assertTrue(all(status is None or 200 <= status < 300 for status in result['status']), (name, result))
+        self.assertEqual(Habit.objects.count(), habits)
+        self.assertEqual(User.objects.count(), users)
+
+    def test_bench_habit_serializers_rolls_back_seeded_habits(self):
+        out = io.StringIO()
+        call_command('bench_habit_serializers', rows=[5], repeat=1, json=True, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())[0]['rows'], 5)
+        self.assertFalse(Habit.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_bench_json_rolls_back_seeded_habits(self):
+        out = io.StringIO()
+        call_command('bench_json', rows=[5], repeat=1, json=True, stdout=out, stderr=io.StringIO())
+        self.assertEqual(json.loads(out.getvalue())[0]['rows'], 5)
+        self.assertFalse(Habit.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class HttpBenchmarkTestCase(LiveServerTestCase):
+    def test_bench_http_keep_alive_connections(self):
+        seed_load(5)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_http', deployments=['wsgi'], wsgi_url=self.live_server_url, connections=[3],
+                         duration=0.5, think_time=0, output=output, stdout=io.StringIO())
+            with open(output) as file:
+                result = json.load(file)['results']['wsgi']['3']
+        self.assertEqual((result['connected'], result['errors']), (3, 0))
+        self.assertGreater(result['requests'], 3)
+
+
+class AsyncHabitViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.habit_ids = [Habit.objects.create(user=self.user, place='Home', action=f'Habit {i}').pk
+                          for i in range(7)]
+        self.auth = f'Bearer {UserTokenObtainPairSerializer.get_token(self.user).access_token}'
+        self.headers = {'Authorization': self.auth}
+        self.client = AsyncClient()
+
+    async def test_list_matches_sync_view(self):
+        response = await self.client.get(reverse('habits:async-list'), {'page_size': 3}, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([habit['id'] for habit in data['results']], self.habit_ids[:3])
+
+        sync_client = APIClient()
+        sync_client.credentials(HTTP_AUTHORIZATION=self.auth)
+        for expand in ('', 'linked_habit,user'):
+            params = {'page_size': 3, 'expand': expand}
+            sync_data = (await sync_to_async(sync_client.get)(reverse('habits:list'), params)).json()
+            async_data = (await self.client.get(reverse('habits:async-list'), params, headers=self.headers)).json()
+            self.assertEqual(async_data['results'], sync_data['results'])
+
+        response = await self.client.get(data['next'], headers=self.headers)
+        self.assertEqual([habit['id'] for habit in response.json()['results']], self.habit_ids[3:6])
+        response = await self.client.get(response.json()['previous'], headers=self.headers)
+        self.assertEqual([habit['id'] for habit in response.json()['results']], self.habit_ids[:3])
+
+    async def test_retrieve(self):
+        url = reverse('habits:async-retrieve', args=[self.habit_ids[0]])
+        response = await self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['action'], 'Habit 0')
+        response = await self.client.get(url, headers={**self.headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        other = await Habit.objects.acreate(user=await User.objects.acreate(email='other@sky.pro'), action='Other')
+        response = await self.client.get(reverse('habits:async-retrieve', args=[other.pk]), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_create(self):
+        url = reverse('habits:async-create')
+        response = await self.client.post(url, {'action': 'Run', 'place': 'Park', 'execution_time': 60},
+                                          content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        habit = await Habit.objects.aget(pk=response.json()['id'])
+        self.assertEqual(habit.user_id, self.user.pk)
+        self.assertIsNotNone(habit.next_due_at)
+
+        response = await self.client.post(url, {'action': 'Run', 'execution_time': 500},
+                                          content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_authentication_required(self):
+        response = await AsyncClient().get(reverse('habits:async-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.client.put(reverse('habits:async-create'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -1,6 +1,9 @@
 from django.urls import path
 from habits.apps import HabitsConfig
-from .api import HabitList, PublicHabitList, HabitCreate, HabitRetrieveAPIView, HabitUpdateAPIView, HabitDestroyAPIView
+from .api import (HabitList, PublicHabitList, HabitCreate, HabitRetrieveAPIView, HabitUpdateAPIView,
+                  HabitDestroyAPIView, HabitBulkAPIView, HabitExportAPIView, HabitImportAPIView,
+                  HabitCacheStatsAPIView)
+from .async_api import AsyncHabitCreate, AsyncHabitList, AsyncHabitRetrieveAPIView
 
 app_name = HabitsConfig.name
 
@@ -11,4 +14,12 @@ urlpatterns = [
     path('<int:pk>/', HabitRetrieveAPIView.as_view(), name='retrieve'),
     path('<int:pk>/update/', HabitUpdateAPIView.as_view(), name='update'),
     path('<int:pk>/delete/', HabitDestroyAPIView.as_view(), name='delete'),
+    path('bulk/', HabitBulkAPIView.as_view(), name='bulk'),
+    path('export/', HabitExportAPIView.as_view(), name='export'),
+    path('import/', HabitImportAPIView.as_view(), name='import'),
+    path('cache/stats/', HabitCacheStatsAPIView.as_view(), name='cache-stats'),
+    # Асинхронные варианты для развёртывания под ASGI
+    path('async/', AsyncHabitList.as_view(), name='async-list'),
+    path('async/create/', AsyncHabitCreate.as_view(), name='async-create'),
+    path('async/<int:pk>/', AsyncHabitRetrieveAPIView.as_view(), name='async-retrieve'),
 ]
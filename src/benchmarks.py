@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Транзакция, которая всегда откатывается: данные, созданные для измерений, и записи измеряемых
+    запросов не остаются в БД. Остальные исключения блока передаются дальше.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
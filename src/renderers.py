@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используется стандартный json
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson с откатом на стандартный JSONRenderer.
+
+    Дата, время, Decimal, ленивые строки и прочие типы, которые orjson не сериализует так же, как DRF,
+    передаются в JSONEncoder DRF, поэтому вывод совпадает с JSONRenderer. Для запросов с отступами
+    (indent) и при отключённых COMPACT_JSON/UNICODE_JSON используется стандартный рендерер.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or not api_settings.COMPACT_JSON or not api_settings.UNICODE_JSON
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except TypeError:
+            # Например, целые числа больше 64 бит
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Как и JSONRenderer, экранируем разделители строк U+2028 и U+2029 для встраивания в JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
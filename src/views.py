@@ -0,0 +1,39 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.generics import GenericAPIView
+
+
+class AsyncGenericAPIView(GenericAPIView):
+    """
+    GenericAPIView с асинхронными обработчиками (async def get/post/...) для работы под ASGI.
+
+    Обработчик выполняется в цикле событий и обращается к БД через асинхронный ORM (aget, acreate,
+    async for), поэтому ожидающее соединение не занимает поток. Аутентификация, проверка прав и
+    ограничение частоты запросов (initial) выполняются одним переходом в поток: аутентификация
+    по JWT при промахе кэша проверяет пользователя синхронным запросом к БД.
+    Исключения и рендеринг обрабатываются так же, как в APIView.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # Синхронные обработчики APIView (options, http_method_not_allowed) возвращают ответ сразу
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import User
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь, построенный из утверждений токена без запроса к БД.
+
+    Идентификатор приводится к типу первичного ключа User (в токене он хранится строкой), поэтому
+    его можно сравнивать с user_id привычек.
+    """
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+
+def get_user_active_key(user_id):
+    return f'users:active:{user_id}'
+
+
+def is_user_active(user_id):
+    """Активен ли пользователь; ответ кэшируется на USER_ACTIVE_CACHE_TIMEOUT секунд."""
+    key = get_user_active_key(user_id)
+    active = cache.get(key)
+    if active is None:
+        active = User.objects.filter(pk=user_id, is_active=True).exists()
+        cache.set(key, active, settings.USER_ACTIVE_CACHE_TIMEOUT)
+    return active
+
+
+def invalidate_user_active(*user_ids):
+    cache.delete_many([get_user_active_key(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя из БД.
+
+    request.user - ClaimsUser, построенный из утверждений токена (user_id, is_staff, is_superuser).
+    Удалённые и деактивированные пользователи отсекаются проверкой is_user_active: её результат
+    кэшируется и сбрасывается при изменении или удалении пользователя.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if not is_user_active(user.id):
+            raise AuthenticationFailed('Пользователь неактивен или удалён.', code='user_inactive')
+        return user
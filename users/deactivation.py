@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.signals import habits_bulk_saved
+from users.models import User
+
+
+def get_inactive_users(threshold):
+    """
+    Активные пользователи (кроме суперпользователей), не входившие с момента threshold.
+
+    Для пользователей без входов учитывается дата регистрации.
+    """
+    return User.objects.filter(
+        Q(last_login__lt=threshold) | Q(last_login__isnull=True, date_joined__lt=threshold),
+        is_active=True, is_superuser=False)
+
+
+def disable_inactive_users(threshold=None, batch_size=None):
+    """
+    Деактивирует пользователей, не входивших дольше USER_INACTIVE_PERIOD, и приостанавливает оповещения их привычек.
+
+    Таблица пользователей обходится окнами по batch_size идентификаторов; в каждом окне одной транзакцией
+    выполняются два UPDATE с подзапросом, пользователи в память не загружаются. Возвращает отчёт
+    с количеством деактивированных пользователей, приостановленных привычек и временем работы.
+    """
+    threshold = threshold or timezone.now() - settings.USER_INACTIVE_PERIOD
+    batch_size = batch_size or settings.USER_DEACTIVATION_BATCH_SIZE
+    started = time.perf_counter()
+    users = habits = 0
+
+    bounds = User.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is not None:
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            inactive = get_inactive_users(threshold).filter(pk__gte=start, pk__lt=start + batch_size)
+            with transaction.atomic():
+                # Сначала привычки: после деактивации пользователи уже не попадут под условие подзапроса.
+                # Индекс оповещений не обновляется - тик перепроверяет next_due_at кандидатов по БД
+                habits += Habit.objects.filter(user__in=inactive.values('pk'), next_due_at__isnull=False).update(
+                    next_due_at=None)
+                users += inactive.update(is_active=False)
+
+    # Кэш активности (USER_ACTIVE_CACHE_TIMEOUT) не сбрасывается: оставшиеся токены перестанут
+    # приниматься не позже чем через его время жизни
+    return {'users': users, 'habits': habits, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def resume_user_habits(user_id):
+    """
+    Возобновляет оповещения привычек пользователя, приостановленных при деактивации.
+
+    Время следующего оповещения считается от текущего момента, индекс оповещений обновляется.
+    Возвращает количество возобновлённых привычек.
+    """
+    habits = list(Habit.objects.filter(user_id=user_id, next_due_at__isnull=True))
+    now = timezone.now()
+    for habit in habits:
+        habit.next_due_at = habit.get_next_due_at(after=now)
+    if habits:
+        Habit.objects.bulk_update(habits, ['next_due_at'])
+        habits_bulk_saved(habits)
+    return len(habits)
@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class VerificationCache:
+    """
+    Кэш недавних успешных проверок паролей в памяти процесса.
+
+    Хранятся только HMAC от пары (хеш пароля, пароль) с ключом из SECRET_KEY, сами пароли не хранятся.
+    При смене пароля меняется хеш, поэтому старые записи перестают совпадать.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.secret = hashlib.sha256(f'users.hashers.VerificationCache{settings.SECRET_KEY}'.encode()).digest()
+
+    def get_key(self, password, encoded):
+        return hmac.new(self.secret, f'{encoded}\0{password}'.encode(), hashlib.sha256).digest()
+
+    def __contains__(self, key):
+        with self.lock:
+            expires_at = self.entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return False
+            self.entries.move_to_end(key)
+            return True
+
+    def add(self, key):
+        with self.lock:
+            self.entries[key] = time.monotonic() + self.timeout
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+_pool = None
+_verification_cache = None
+_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """Общий пул потоков для хеширования: одновременно вычисляется не больше PASSWORD_HASH_WORKERS хешей."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+        return _pool
+
+
+def get_verification_cache():
+    """Кэш проверок паролей или None, если он отключён (PASSWORD_VERIFY_CACHE_SIZE = 0)."""
+    global _verification_cache
+    with _lock:
+        if _verification_cache is None and settings.PASSWORD_VERIFY_CACHE_SIZE:
+            _verification_cache = VerificationCache(settings.PASSWORD_VERIFY_CACHE_SIZE,
+                                                    settings.PASSWORD_VERIFY_CACHE_TIMEOUT)
+        return _verification_cache
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с количеством итераций из настроек и вычислением в ограниченном пуле потоков.
+
+    Формат хеша совпадает со стандартным pbkdf2_sha256, поэтому существующие пароли проверяются как раньше.
+    При входе хеши с другим количеством итераций пересчитываются (must_update). hashlib освобождает GIL
+    на время вычисления, а размер пула ограничивает число ядер, занятых хешированием, чтобы
+    остальные запросы не ждали процессор.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        return get_hash_pool().submit(super().encode, password, salt, iterations).result()
+
+    def verify(self, password, encoded):
+        verification_cache = get_verification_cache()
+        if verification_cache is None:
+            return super().verify(password, encoded)
+        key = verification_cache.get_key(password, encoded)
+        if key in verification_cache:
+            return True
+        verified = super().verify(password, encoded)
+        if verified:
+            verification_cache.add(key)
+        return verified
@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management import BaseCommand
+from django.test import override_settings
+
+from src.benchmarks import rolled_back
+from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure logins per second per core for PBKDF2 iteration counts (all writes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, nargs='+', help='Iteration counts (PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--threads', type=int, default=os.cpu_count(), help='Concurrent logins')
+        parser.add_argument('--logins', type=int, default=50, help='Logins per measurement')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        cores = min(options['threads'], os.cpu_count() or 1, settings.PASSWORD_HASH_WORKERS)
+        results = []
+        for iterations in options['iterations'] or [settings.PASSWORD_HASH_ITERATIONS]:
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+                result = {'iterations': iterations, 'threads': options['threads'], 'cores': cores}
+                result.update(self.measure_verify(options['threads'], options['logins'], cores))
+                result.update(self.measure_login(max(options['logins'] // 5, 2)))
+                with override_settings(PASSWORD_VERIFY_CACHE_SIZE=1000):
+                    cached = self.measure_verify(options['threads'], options['logins'], cores, cache=True)
+                result['cached_logins_per_second'] = cached['logins_per_second']
+                results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f'{result["iterations"]:>8} iterations: {result["logins_per_second"]:.1f} logins/s on '
+                f'{result["cores"]} core(s), {result["logins_per_second_per_core"]:.1f} per core; '
+                f'token endpoint p50 {result["login_p50_ms"]:.0f} ms; '
+                f'repeated logins with verification cache {result["cached_logins_per_second"]:.0f}/s')
+
+    def measure_verify(self, threads, logins, cores, cache=False):
+        """
+        Пропускная способность проверки пароля при threads одновременных входах.
+
+        С cache=True измеряются повторные входы с уже проверенным паролем (кэш прогревается заранее).
+        """
+        from users import hashers
+
+        hasher = get_hasher('pbkdf2_sha256')
+        encoded = make_password(BENCH_PASSWORD, hasher=hasher)
+        # Кэш проверок создаётся заново под текущие настройки
+        hashers._verification_cache = None
+        try:
+            if cache:
+                hasher.verify(BENCH_PASSWORD, encoded)
+            with ThreadPoolExecutor(threads) as executor:
+                started = time.perf_counter()
+                assert all(executor.map(lambda _: hasher.verify(BENCH_PASSWORD, encoded), range(logins)))
+                seconds = time.perf_counter() - started
+        finally:
+            hashers._verification_cache = None
+        return {
+            'logins_per_second': logins / seconds,
+            'logins_per_second_per_core': logins / seconds / cores,
+        }
+
+    def measure_login(self, logins):
+        """Задержка получения токенов (как в users:token_obtain_pair) одним клиентом."""
+        timings = []
+        with rolled_back():
+            user = User(email='bench_logins@example.com')
+            user.password = make_password(BENCH_PASSWORD, hasher='pbkdf2_sha256')
+            user.save()
+            for _ in range(logins):
+                started = time.perf_counter()
+                serializer = UserTokenObtainPairSerializer(
+                    data={'email': user.email, 'password': BENCH_PASSWORD})
+                serializer.is_valid(raise_exception=True)
+                timings.append((time.perf_counter() - started) * 1000)
+        return {'login_p50_ms': statistics.median(timings)}
@@ -0,0 +1,39 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, pbkdf2
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Pick PBKDF2 iterations (PASSWORD_HASH_ITERATIONS) that fit a login latency budget on this machine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=250, help='Hashing time allowed per login')
+        parser.add_argument('--probe-iterations', type=int, default=100000, help='Iterations of the probe hash')
+        parser.add_argument('--samples', type=int, default=5, help='Probe hashes to time')
+
+    def handle(self, *args, **options):
+        timings = []
+        for _ in range(options['samples']):
+            started = time.perf_counter()
+            pbkdf2('calibration', 'calibration-salt', options['probe_iterations'])
+            timings.append(time.perf_counter() - started)
+        ms_per_iteration = statistics.median(timings) * 1000 / options['probe_iterations']
+
+        # Округляем вниз до десятков тысяч, чтобы не выйти за бюджет
+        iterations = int(options['budget_ms'] / ms_per_iteration) // 10000 * 10000
+        current = settings.PASSWORD_HASH_ITERATIONS
+        self.stdout.write(f'PBKDF2-SHA256: {ms_per_iteration * 1e6:.1f} ns per iteration')
+        self.stdout.write(f'Current: PASSWORD_HASH_ITERATIONS={current} '
+                          f'({current * ms_per_iteration:.0f} ms per login, '
+                          f'{1000 / (current * ms_per_iteration):.1f} logins/s per core)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Budget {options["budget_ms"]:.0f} ms: PASSWORD_HASH_ITERATIONS={iterations} '
+            f'({1000 / (iterations * ms_per_iteration) if iterations else 0:.1f} logins/s per core)'))
+        if iterations < PBKDF2PasswordHasher.iterations:
+            self.stderr.write(self.style.WARNING(
+                f'{iterations} is below Django\'s default of {PBKDF2PasswordHasher.iterations} iterations: '
+                f'passwords become cheaper to brute-force if hashes leak. Consider a larger budget or '
+                f'PASSWORD_VERIFY_CACHE_SIZE for repeated logins instead.'))
@@ -13,7 +13,7 @@ class Command(BaseCommand):
         email = options['email']
         password = options['password']
 
-        user = User.objects.create(
+        user = User(
             email=email,
             is_superuser=False,
             is_staff=False,
@@ -8,8 +8,8 @@ from users.models import User
 class Command(BaseCommand):
     # Определение метода handle, который будет выполняться при вызове команды
     def handle(self, *args, **options):
-        # Создание пользователя с предопределенными значениями
-        user = User.objects.create(
+        # Пользователь с предопределенными значениями собирается без сохранения
+        user = User(
             first_name='admin',  # Установка имени пользователя
             email='admin@sky.pro',  # Установка электронной почты пользователя
             last_name='SkyPro',  # Установка фамилии пользователя
@@ -18,5 +18,5 @@ class Command(BaseCommand):
         )
         # Установка пароля для пользователя
         user.set_password('admin')
-        # Сохранение изменений в базе данных
+        # Запись пользователя в базу данных одним INSERT
         user.save()
@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from users.provisioning import UserProvisioner, read_users
+
+
+class Command(BaseCommand):
+    help = 'Create users in bulk from a CSV or NDJSON file (email, password, first_name, last_name, phone, ' \
+           'country, tlg_chat_id) or generate load-test users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, nargs='?', help='File with users, "-" for stdin')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'ndjson'],
+                            help='File format (by default guessed from the extension)')
+        parser.add_argument('--generate', type=int, help='Generate N users <prefix>_<i>@example.com instead of a file')
+        parser.add_argument('--prefix', type=str, default='load', help='Email prefix of generated users')
+        parser.add_argument('--password', type=str, default='password', help='Password of generated users')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users hashed and inserted at a time')
+        parser.add_argument('--workers', type=int, help='Hashing processes (CPU count by default)')
+        parser.add_argument('--fast-hash', action='store_true',
+                            help='Use the cheap FAST_PASSWORD_HASHER (test and load-test fixtures only)')
+        parser.add_argument('--errors', action='store_true', help='Print skipped users')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            rows = ({'email': f'{options["prefix"]}_{i}@example.com', 'password': options['password']}
+                    for i in range(options['generate']))
+            source = None
+        elif options['file']:
+            file_format = options['file_format'] or ('csv' if options['file'].endswith('.csv') else 'ndjson')
+            source = sys.stdin if options['file'] == '-' else open(options['file'], encoding='utf-8-sig', newline='')
+            rows = read_users(source, file_format)
+        else:
+            raise CommandError('Pass a file or --generate N')
+
+        try:
+            provisioner = UserProvisioner(options['batch_size'], options['workers'], options['fast_hash'])
+        except ValueError as exc:
+            # Хешер не указан в PASSWORD_HASHERS
+            raise CommandError(f'{exc}. Set FAST_PASSWORD_HASHER=True to allow --fast-hash')
+        try:
+            report = provisioner.run(rows)
+        finally:
+            if source not in (None, sys.stdin):
+                source.close()
+
+        if options['errors']:
+            for error in report['errors']:
+                self.stderr.write(f'{error["email"]}: {error["error"]}' if error['email'] else error['error'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report["created"]} users, skipped {report["skipped"]} '
+            f'in {report["seconds"]:.2f} s ({report["users_per_second"]} users/s)'))
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def copy_verification_codes(apps, schema_editor):
+    # Действующие коды неподтверждённых пользователей переносятся с обычным сроком действия;
+    # повторяющиеся коды (они были короткими) пропускаются
+    User = apps.get_model('users', 'User')
+    EmailVerification = apps.get_model('users', 'EmailVerification')
+    expires_at = timezone.now() + settings.VERIFICATION_CODE_LIFETIME
+    users = (User.objects.filter(is_verified=False, verification_code__isnull=False)
+             .values_list('pk', 'verification_code').iterator(chunk_size=2000))
+    batch = []
+    for user_id, code in users:
+        batch.append(EmailVerification(user_id=user_id, code=code, expires_at=expires_at))
+        if len(batch) >= 2000:
+            EmailVerification.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        EmailVerification.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_remove_user_tlg_bot_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailVerification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=35, unique=True, verbose_name='Код')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата выдачи')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='verification', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Код подтверждения',
+                'verbose_name_plural': 'Коды подтверждения',
+            },
+        ),
+        migrations.RunPython(copy_verification_codes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='verification_code',
+        ),
+    ]
@@ -1,5 +1,3 @@
-import uuid
-
 from django.db import models
 from src.constants import NULLABLE
 from django.contrib.auth.models import AbstractUser
@@ -22,9 +20,6 @@ class User(AbstractUser):
     # Поле для хранения страны пользователя
     country = models.CharField(max_length=35, verbose_name='Страна', **NULLABLE)
 
-    # Поле для хранения верификационного кода пользователя, который генерируется рандомно при создании пользователя
-    verification_code = models.CharField(max_length=35, verbose_name='Код', **NULLABLE)
-
     # Поле для хранения значения верифицирован ли пользователь. По умолчанию - False
     is_verified = models.BooleanField(default=False, verbose_name='Верификация')
 
@@ -40,8 +35,49 @@ class User(AbstractUser):
     # Чат-ID для работы с тлг-ботом
     tlg_chat_id = models.CharField(max_length=100, verbose_name='Чат ID тлг-бота', **NULLABLE)
 
-    # Переопределяем метод save для автоматической генерации verification_code при создании пользователя
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженное из БД значение is_active, чтобы знать, что пользователя активировали заново
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @property
+    def was_active(self):
+        """Был ли пользователь активен на момент загрузки из БД (None - если не загружался или поле отложено)."""
+        return getattr(self, '_loaded_values', {}).get('is_active')
+
     def save(self, *args, **kwargs):
-        # Генерируем уникальный код с помощью функции uuid4()
-        self.verification_code = str(uuid.uuid4())[:8]
         super().save(*args, **kwargs)
+        self._remember_is_active()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_is_active()
+
+    def _remember_is_active(self):
+        if 'is_active' in self.__dict__:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), 'is_active': self.is_active}
+
+
+# Класс модели кодов подтверждения почты
+class EmailVerification(models.Model):
+    # Пользователь, которому выдан код (у пользователя не больше одного действующего кода)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='verification',
+                                verbose_name='Пользователь')
+
+    # Код подтверждения, по нему ищется запись при подтверждении почты
+    code = models.CharField(max_length=35, unique=True, verbose_name='Код')
+
+    # Дата и время выдачи кода
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата выдачи')
+
+    # Срок действия кода, просроченные коды удаляются задачей delete_expired_verifications
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Действует до')
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.code}'
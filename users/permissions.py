@@ -3,4 +3,5 @@ from rest_framework import permissions
 
 class IsOwnerPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        # Сравниваем идентификаторы, чтобы не загружать пользователя привычки из БД
+        return obj.user_id == request.user.id
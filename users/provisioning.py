@@ -0,0 +1,146 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from users.models import User
+from users.verification import issue_verifications
+
+# Поля пользователя, которые можно передать в файле (кроме пароля)
+PROVISION_FIELDS = ('email', 'first_name', 'last_name', 'phone', 'country', 'tlg_chat_id')
+
+# Сколько пропущенных строк возвращается в отчёте (счётчик учитывает все)
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_users(lines, file_format):
+    """
+    Строки файла пользователей (CSV с заголовком или NDJSON) в виде словарей полей.
+
+    Вместо строки NDJSON, которую не удалось разобрать, возвращается текст ошибки - она пропускается
+    и попадает в отчёт, остальные строки файла загружаются.
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield f'Строка {number}: некорректный JSON: {exc}'
+            continue
+        yield row if isinstance(row, dict) else f'Строка {number}: ожидается объект JSON.'
+
+
+def _hash_passwords(passwords, algorithm):
+    return [make_password(password, hasher=algorithm) for password in passwords]
+
+
+class UserProvisioner:
+    """
+    Создание пользователей пачками по batch_size.
+
+    Пароли пачки хешируются в пуле процессов (хеширование нагружает процессор и в потоках
+    не распараллеливается), пользователи записываются одним bulk_create, коды подтверждения - ещё одним.
+    Пользователи с некорректной почтой, а также уже существующие или повторяющиеся в файле пропускаются.
+
+    fast_hash - хешировать пароли быстрым нестойким хешером FAST_PASSWORD_HASHER (для нагрузочных стендов),
+    он должен быть разрешён в PASSWORD_HASHERS. Одинаковые пароли в этом режиме хешируются один раз.
+    """
+
+    def __init__(self, batch_size=1000, workers=None, fast_hash=False):
+        self.batch_size = batch_size
+        algorithm = import_string(settings.FAST_PASSWORD_HASHER).algorithm if fast_hash else 'default'
+        # ValueError, если хешер не разрешён в PASSWORD_HASHERS
+        self.algorithm = get_hasher(algorithm).algorithm
+        # Быстрый хешер дешевле передачи паролей между процессами
+        self.workers = 0 if fast_hash else workers or os.cpu_count()
+        self.hashes = {} if fast_hash else None
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def run(self, rows):
+        """Создаёт пользователей из словарей rows и возвращает отчёт."""
+        started = time.perf_counter()
+        rows = iter(rows)
+        executor = ProcessPoolExecutor(self.workers, initializer=django.setup) if self.workers > 1 else None
+        try:
+            for batch in iter(lambda: list(islice(rows, self.batch_size)), []):
+                self.save(batch, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        seconds = time.perf_counter() - started
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'users_per_second': round((self.created + self.skipped) / seconds) if seconds else 0,
+        }
+
+    def skip(self, email, error):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'email': email, 'error': error})
+
+    def hash_passwords(self, passwords, executor):
+        if self.hashes is not None:
+            for password in set(passwords) - self.hashes.keys():
+                self.hashes[password] = make_password(password, hasher=self.algorithm)
+            return [self.hashes[password] for password in passwords]
+        if executor is None:
+            return _hash_passwords(passwords, self.algorithm)
+        # Пароли делятся на части по числу процессов, чтобы не передавать их по одному
+        size = -(-len(passwords) // self.workers)
+        parts = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+        return [encoded for part in executor.map(_hash_passwords, parts, [self.algorithm] * len(parts))
+                for encoded in part]
+
+    def save(self, batch, executor):
+        users = {}
+        for row in batch:
+            if isinstance(row, str):
+                self.skip(None, row)
+                continue
+            email = BaseUserManager.normalize_email(row.get('email') or '')
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.skip(email, 'Некорректная почта.')
+                continue
+            if email in users:
+                self.skip(email, 'Почта повторяется в файле.')
+                continue
+            fields = {name: row[name] for name in PROVISION_FIELDS if row.get(name) not in (None, '')}
+            users[email] = (User(**{**fields, 'email': email}), row.get('password') or None)
+
+        for email in User.objects.filter(email__in=users).values_list('email', flat=True):
+            self.skip(email, 'Пользователь уже существует.')
+            del users[email]
+        if not users:
+            return
+
+        passwords = self.hash_passwords([password for _, password in users.values()], executor)
+        for (user, _), password in zip(users.values(), passwords):
+            user.password = password
+        with transaction.atomic():
+            created = User.objects.bulk_create([user for user, _ in users.values()])
+            # bulk_create не отправляет post_save, поэтому коды подтверждения выдаём здесь
+            issue_verifications(created)
+        self.created += len(users)
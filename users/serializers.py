@@ -1,4 +1,7 @@
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from users.models import User
 
 
@@ -16,3 +19,25 @@ class UserSerializer(serializers.ModelSerializer):
         user.set_password(password)
         user.save()
         return user
+
+
+# Сериализатор получения токенов: права пользователя передаются в утверждениях токена
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+# Сериализатор обновления токенов: обновление тоже считается входом, иначе пользователь,
+# который только обновляет токены, был бы деактивирован как неактивный
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if api_settings.UPDATE_LAST_LOGIN:
+            # Токен уже проверен выше; повторная проверка наткнулась бы на чёрный список после ротации
+            user_id = self.token_class(attrs['refresh'], verify=False)[api_settings.USER_ID_CLAIM]
+            User.objects.filter(pk=user_id).update(last_login=timezone.now())
+        return data
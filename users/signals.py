@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import invalidate_user_active
+from users.deactivation import resume_user_habits
+from users.verification import issue_verifications
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_status(sender, instance, **kwargs):
+    # Сбрасываем кэшированную проверку активности, чтобы деактивация действовала сразу
+    invalidate_user_active(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def issue_user_verification(sender, instance, created, **kwargs):
+    # Код подтверждения выдаётся один раз при создании пользователя, изменения пользователя его не трогают
+    if created:
+        issue_verifications([instance])
+
+
+@receiver(post_save, sender=User)
+def resume_reactivated_user_habits(sender, instance, created, update_fields=None, **kwargs):
+    # Привычки, приостановленные disable_inactive_users, возобновляются, когда пользователя активируют заново.
+    # Сохранения без изменения is_active (например, запись last_login при входе) запросов не добавляют
+    if created or not instance.is_active or instance.was_active is True:
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: resume_user_habits(user_id))
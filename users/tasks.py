@@ -0,0 +1,23 @@
+import logging
+
+from celery import shared_task
+
+from users.deactivation import disable_inactive_users as disable_inactive
+from users.verification import delete_expired_verifications as delete_expired
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def disable_inactive_users():
+    # Пользователи деактивируются пачками по условию на last_login, без загрузки в память
+    report = disable_inactive()
+    logger.info('Деактивировано пользователей: %(users)s, приостановлено привычек: %(habits)s за %(seconds)s с',
+                report)
+    return report
+
+
+@shared_task
+def delete_expired_verifications():
+    # Просроченные коды подтверждения удаляются пачками, чтобы не держать долгих блокировок
+    return delete_expired()
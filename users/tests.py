@@ -0,0 +1,260 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password, pbkdf2
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from habits.models import Habit
+from users import hashers
+from users.hashers import PooledPBKDF2PasswordHasher
+from users.models import EmailVerification, User
+from users.provisioning import UserProvisioner
+from users.tasks import delete_expired_verifications, disable_inactive_users
+
+
+class CreateSuperuserCommandTestCase(TestCase):
+    def test_single_insert(self):
+        with CaptureQueriesContext(connection) as context:
+            call_command('csu')
+        self.assertEqual([query['sql'].split()[0] for query in context if 'users_user' in query['sql']],
+                         ['INSERT'])
+        user = User.objects.get(email='admin@sky.pro')
+        self.assertTrue(user.is_superuser and user.check_password('admin'))
+
+
+class UserProvisioningTestCase(TestCase):
+    def setUp(self):
+        User.objects.create(email='existing@sky.pro')
+
+    def test_provision_from_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('email,password,tlg_chat_id\n'
+                       'first@sky.pro,secret1,100\n'
+                       'second@SKY.PRO,,\n'
+                       'existing@sky.pro,secret,\n'
+                       'first@sky.pro,secret,\n'
+                       'not-an-email,secret,\n')
+        self.addCleanup(os.remove, file.name)
+        out = io.StringIO()
+        call_command('provision_users', file.name, fast_hash=True, batch_size=2, stdout=out)
+        self.assertIn('Created 2 users, skipped 3', out.getvalue())
+
+        first = User.objects.get(email='first@sky.pro')
+        self.assertTrue(first.check_password('secret1'))
+        self.assertEqual(first.tlg_chat_id, '100')
+        self.assertEqual(len(first.verification.code), 22)
+        self.assertFalse(User.objects.get(email='second@sky.pro').has_usable_password())
+
+    def test_provision_skips_malformed_ndjson(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write('{"email": "first@sky.pro"}\n'
+                       '{"email": \n'
+                       '["second@sky.pro"]\n'
+                       '{"email": "third@sky.pro"}\n')
+        self.addCleanup(os.remove, file.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('provision_users', file.name, fast_hash=True, errors=True, stdout=out, stderr=err)
+        self.assertIn('Created 2 users, skipped 2', out.getvalue())
+        self.assertIn('Строка 2: некорректный JSON', err.getvalue())
+        self.assertIn('Строка 3: ожидается объект JSON.', err.getvalue())
+        self.assertEqual(User.objects.filter(email__in=['first@sky.pro', 'third@sky.pro']).count(), 2)
+
+    def test_provision_in_process_pool(self):
+        report = UserProvisioner(batch_size=3, workers=2).run(
+            {'email': f'user_{i}@sky.pro', 'password': f'secret{i}'} for i in range(5))
+        self.assertEqual(report['created'], 5)
+        for i, user in enumerate(User.objects.filter(email__startswith='user_').order_by('id')):
+            self.assertTrue(check_password(f'secret{i}', user.password))
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+    def test_fast_hash_requires_setting(self):
+        with self.assertRaises(CommandError):
+            call_command('provision_users', generate=1, fast_hash=True, stdout=io.StringIO())
+
+
+class ClaimsAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user_test@sky.pro', is_staff=True)
+        self.user.set_password('user_test')
+        self.user.save()
+        response = APIClient().post(reverse('users:token_obtain_pair'),
+                                    {'email': 'user_test@sky.pro', 'password': 'user_test'}, format='json')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+    def test_no_user_query(self):
+        self.client.get(reverse('habits:list'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('habits:list'), {'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(User._meta.db_table in query['sql'] for query in queries))
+
+        response = self.client.get(reverse('habits:cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_and_owner_checks(self):
+        other = User.objects.create(email='other@sky.pro')
+        response = self.client.post(reverse('habits:create'), {'action': 'Exercise', 'user': other.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        habit = Habit.objects.get(pk=response.data['id'])
+        self.assertEqual(habit.user, self.user)
+
+        response = self.client.patch(reverse('habits:update', args=[habit.pk]), {'user': other.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        habit.refresh_from_db()
+        self.assertEqual(habit.user, self.user)
+        response = self.client.get(reverse('habits:retrieve', args=[habit.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_rejected(self):
+        self.assertEqual(self.client.get(reverse('habits:list')).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('habits:list')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.delete()
+        self.assertEqual(self.client.get(reverse('habits:list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PooledPasswordHasherTestCase(TestCase):
+    def setUp(self):
+        self.hasher = PooledPBKDF2PasswordHasher()
+        hashers._verification_cache = None
+        self.addCleanup(setattr, hashers, '_verification_cache', None)
+
+    def test_compatible_with_pbkdf2(self):
+        encoded = self.hasher.encode('secret', 'salt')
+        self.assertEqual(encoded, PBKDF2PasswordHasher().encode('secret', 'salt', 1000))
+        self.assertTrue(self.hasher.verify('secret', encoded))
+        self.assertFalse(self.hasher.verify('wrong', encoded))
+        self.assertFalse(self.hasher.must_update(self.hasher.encode('secret', self.hasher.salt())))
+        self.assertTrue(self.hasher.must_update(PBKDF2PasswordHasher().encode('secret', self.hasher.salt(), 2000)))
+
+    @override_settings(PASSWORD_VERIFY_CACHE_SIZE=10)
+    def test_verification_cache(self):
+        encoded = self.hasher.encode('secret', 'salt')
+        with mock.patch('django.contrib.auth.hashers.pbkdf2', wraps=pbkdf2) as hash_function:
+            self.assertTrue(self.hasher.verify('secret', encoded))
+            self.assertTrue(self.hasher.verify('secret', encoded))
+            self.assertFalse(self.hasher.verify('wrong', encoded))
+            self.assertFalse(self.hasher.verify('wrong', encoded))
+        self.assertEqual(hash_function.call_count, 3)
+
+    def test_refresh_token_rotation(self):
+        User.objects.create(email='user_test@sky.pro', password=make_password('user_test', hasher='pbkdf2_sha256'))
+        client = APIClient()
+        response = client.post(reverse('users:token_obtain_pair'),
+                               {'email': 'user_test@sky.pro', 'password': 'user_test'}, format='json')
+        refresh = response.data['refresh']
+        response = client.post(reverse('users:token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], refresh)
+        response = client.post(reverse('users:token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class EmailVerificationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user_test@sky.pro')
+        self.client = APIClient()
+
+    def test_code_issued_once(self):
+        code = self.user.verification.code
+        self.user.tlg_chat_id = '100'
+        with CaptureQueriesContext(connection) as context:
+            self.user.save()
+        self.assertEqual(len(context), 1)
+        self.assertEqual(EmailVerification.objects.get(user=self.user).code, code)
+
+    def test_verify(self):
+        code = self.user.verification.code
+        response = self.client.post(reverse('users:verify'), {'code': code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_verified)
+        self.assertFalse(EmailVerification.objects.exists())
+
+        response = self.client.post(reverse('users:verify'), {'code': code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_code(self):
+        EmailVerification.objects.update(expires_at=timezone.now())
+        response = self.client.post(reverse('users:verify'), {'code': self.user.verification.code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_verified)
+
+    @override_settings(VERIFICATION_CLEANUP_BATCH_SIZE=2)
+    def test_delete_expired(self):
+        for i in range(4):
+            User.objects.create(email=f'user_{i}@sky.pro')
+        EmailVerification.objects.exclude(user=self.user).update(expires_at=timezone.now())
+        self.assertEqual(delete_expired_verifications(), 4)
+        self.assertEqual(list(EmailVerification.objects.values_list('user_id', flat=True)), [self.user.pk])
+
+
+class DisableInactiveUsersTestCase(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=365)
+        self.inactive = User.objects.create(email='inactive@sky.pro', last_login=old)
+        self.never_logged_in = User.objects.create(email='never@sky.pro', date_joined=old)
+        self.active = User.objects.create(email='active@sky.pro', last_login=timezone.now())
+        User.objects.create(email='admin@sky.pro', is_superuser=True, last_login=old)
+        self.habit = Habit.objects.create(user=self.inactive, action='Бег', place='Парк', execution_time=60)
+        self.active_habit = Habit.objects.create(user=self.active, action='Чтение', place='Дом', execution_time=60)
+
+    @override_settings(USER_DEACTIVATION_BATCH_SIZE=2)
+    def test_disable_inactive_users(self):
+        with CaptureQueriesContext(connection) as context:
+            report = disable_inactive_users()
+        # Границы идентификаторов и по два UPDATE на каждое из двух окон, без выборки пользователей
+        self.assertEqual(len([query for query in context if query['sql'].startswith('UPDATE')]), 4)
+        self.assertEqual((report['users'], report['habits']), (2, 1))
+        self.assertEqual(set(User.objects.filter(is_active=False).values_list('email', flat=True)),
+                         {'inactive@sky.pro', 'never@sky.pro'})
+        self.habit.refresh_from_db()
+        self.active_habit.refresh_from_db()
+        self.assertIsNone(self.habit.next_due_at)
+        self.assertIsNotNone(self.active_habit.next_due_at)
+        self.assertEqual(disable_inactive_users()['users'], 0)
+
+    def test_reactivation_resumes_habits(self):
+        disable_inactive_users()
+        user = User.objects.get(pk=self.inactive.pk)
+        # Сохранение без изменения is_active привычки не возобновляет
+        user.save()
+        self.habit.refresh_from_db()
+        self.assertIsNone(self.habit.next_due_at)
+
+        user.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.habit.refresh_from_db()
+        self.assertGreater(self.habit.next_due_at, timezone.now())
+
+    def test_login_and_refresh_update_last_login(self):
+        self.inactive.set_password('user_test')
+        self.inactive.save()
+        client = APIClient()
+        response = client.post(reverse('users:token_obtain_pair'),
+                               {'email': 'inactive@sky.pro', 'password': 'user_test'}, format='json')
+        self.inactive.refresh_from_db()
+        logged_in_at = self.inactive.last_login
+        self.assertGreater(logged_in_at, timezone.now() - timedelta(minutes=1))
+
+        response = client.post(reverse('users:token_refresh'), {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.inactive.refresh_from_db()
+        self.assertGreater(self.inactive.last_login, logged_in_at)
+        self.assertEqual(disable_inactive_users()['users'], 1)
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import (
 
 from habits.api import UserRegistrationView
 from users.apps import UsersConfig
+from users.views import EmailVerificationView
 
 
 app_name = UsersConfig.name
@@ -14,4 +15,5 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', UserRegistrationView.as_view(), name='user-registration'),
+    path('verify/', EmailVerificationView.as_view(), name='verify'),
 ]
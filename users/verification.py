@@ -0,0 +1,61 @@
+import secrets
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import EmailVerification, User
+
+
+def make_verification_code():
+    return secrets.token_urlsafe(16)
+
+
+def issue_verifications(users):
+    """
+    Выдаёт коды подтверждения пользователям users одним запросом и возвращает их.
+
+    Используется при создании пользователей, в том числе через bulk_create (без сигналов).
+    """
+    expires_at = timezone.now() + settings.VERIFICATION_CODE_LIFETIME
+    return EmailVerification.objects.bulk_create(
+        EmailVerification(user_id=user.pk, code=make_verification_code(), expires_at=expires_at)
+        for user in users if not user.is_verified)
+
+
+def reissue_verification(user_id):
+    """Новый код подтверждения вместо прежнего (например, если прежний истёк)."""
+    verification, _ = EmailVerification.objects.update_or_create(user_id=user_id, defaults={
+        'code': make_verification_code(),
+        'expires_at': timezone.now() + settings.VERIFICATION_CODE_LIFETIME,
+    })
+    return verification
+
+
+def verify_code(code):
+    """
+    Подтверждает почту по коду. Возвращает идентификатор пользователя или None, если код не найден или истёк.
+
+    Код одноразовый: после подтверждения он удаляется.
+    """
+    with transaction.atomic():
+        verification = (EmailVerification.objects.select_for_update()
+                        .filter(code=code, expires_at__gt=timezone.now()).only('user_id').first())
+        if verification is None:
+            return None
+        User.objects.filter(pk=verification.user_id).update(is_verified=True)
+        verification.delete()
+    return verification.user_id
+
+
+def delete_expired_verifications(batch_size=None):
+    """Удаляет просроченные коды пачками по batch_size и возвращает их количество."""
+    batch_size = batch_size or settings.VERIFICATION_CLEANUP_BATCH_SIZE
+    expired = EmailVerification.objects.filter(expires_at__lte=timezone.now())
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # У кодов нет зависимых записей и сигналов, поэтому Django удаляет их одним DELETE без загрузки объектов
+        deleted += EmailVerification.objects.filter(pk__in=ids).delete()[0]
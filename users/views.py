@@ -0,0 +1,33 @@
+from rest_framework import serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.views import APIView
+
+from users.verification import verify_code
+
+
+# Сериализатор кода подтверждения почты
+class EmailVerificationSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=35)
+
+
+class EmailVerificationView(APIView):
+    """
+    API для подтверждения почты пользователя.
+
+    Поля:
+    - code: код подтверждения, выданный при регистрации.
+
+    Запросы:
+    - POST: Подтверждение почты. Код одноразовый и действует VERIFICATION_CODE_LIFETIME.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        serializer = EmailVerificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if verify_code(serializer.validated_data['code']) is None:
+            return Response({'code': ['Код не найден или истёк.']}, status=HTTP_400_BAD_REQUEST)
+        return Response({'detail': 'Почта подтверждена.'})